@@ -0,0 +1,75 @@
+import argparse
+import time
+import numpy as np
+
+from src.io.synthetic import SyntheticDepthScene
+from src.detectors.angular_detector import Sector, AngularBounds
+from src.detectors.sector_engine import MultiSectorDetector
+from src.piano.main import load_instrument
+
+def make_sectors(num_sectors: int) -> list:
+    """The configured sectors, or num_sectors rays spread evenly over the field of view."""
+    configured = [swm.sector for swm in load_instrument().sectors_with_mappers]
+    if num_sectors <= 0:
+        return configured
+    template = configured[0].bounds
+    centers = np.linspace(-38, 38, num_sectors)
+    return [
+        Sector(f"Ray {i}", (255, 255, 255), AngularBounds(
+            azimuth_center=float(center),
+            azimuth_span=min(template.azimuth_span, 76 / num_sectors),
+            elevation_center=template.elevation_center,
+            elevation_span=template.elevation_span,
+            min_range=template.min_range,
+            max_range=template.max_range
+        ))
+        for i, center in enumerate(centers)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sector detection on synthetic depth frames.")
+    parser.add_argument("--frames", type=int, default=300, help="Number of frames to process.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--sectors", type=int, default=0, help="Number of evenly spread sectors (0 = use config.yaml).")
+    parser.add_argument("--players", type=int, default=None, help="Number of players (default: one per sector).")
+    args = parser.parse_args()
+
+    sectors = make_sectors(args.sectors)
+    scene = SyntheticDepthScene(sectors, width=args.width, height=args.height, num_players=args.players)
+
+    # Pre-render the frames so only the detector is timed
+    start = time.perf_counter()
+    frames = [scene.render(i) for i in range(args.frames)]
+    generate_s = time.perf_counter() - start
+
+    detector = MultiSectorDetector(sectors)
+    detector.detect(frames[0][0])  # Compile outside the timed loop
+    errors = []
+    start = time.perf_counter()
+    for frame_data, _ in frames:
+        detector.detect(frame_data)
+    engine_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame_data, _ in frames:
+        for sector in sectors:
+            sector.detect(frame_data)
+    per_sector_s = time.perf_counter() - start
+
+    for frame_data, ground_truth_m in frames:
+        for detection, truth in zip(detector.detect(frame_data), ground_truth_m):
+            if detection is not None and not np.isnan(truth):
+                errors.append(abs(detection.min_distance_m - truth))
+
+    print(f"{args.frames} frames {args.width}x{args.height}, {len(sectors)} sectors, "
+          f"{scene.num_players} players")
+    print(f"Generate:           {args.frames / generate_s:8.1f} FPS")
+    print(f"Compiled engine:    {args.frames / engine_s:8.1f} FPS")
+    print(f"Per-sector detect:  {args.frames / per_sector_s:8.1f} FPS")
+    if errors:
+        print(f"Min distance error vs ground truth: mean {np.mean(errors) * 1000:.1f} mm, "
+              f"max {np.max(errors) * 1000:.1f} mm")
+
+if __name__ == "__main__":
+    main()
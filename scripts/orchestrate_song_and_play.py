@@ -1,18 +1,42 @@
 import os
 import time
-import yaml
+import argparse
 import numpy as np
 
-from src.piano.voices import SectorDistanceToNoteMapper, NoteMapperConfig, C_MAJOR_FREQUENCIES
-from src.piano.tone_generator import ToneGenerator
+from src.piano.config_loader import CONFIG_PATH, load_config
+from src.piano.voices import SectorDistanceToNoteMapper
+from src.piano.offline_render import SAMPLE_RATE, RenderJob, render_batch, render_sequence, write_wav
+from src.piano.sequencer import TempoChange, compile_sequence, orchestration_to_notes
 
 bpm = 20  # beats per minute
 note_duration = 60 / (bpm * 4)  # Duration of a quarter note in seconds
 
-def load_config(config_path: str) -> dict:
-    """Load the YAML configuration."""
-    with open(config_path, 'r') as file:
-        return yaml.safe_load(file)
+# Example melodies in the key of C (adjust as desired)
+full_scale_melody = [
+    "C2", "D2", "E2", "F2", "G2", "A2", "B2", "C3",
+    "D3", "E3", "F3", "G3", "A3", "B3", "C4", "D4",
+    "E4", "F4", "G4", "A4", "B4", "C5"
+]
+
+mary_had_a_little_lamb_melody = [
+    "E4", "D4", "C4", "D4", "E4", "E4", "E4", "D4",
+    "D4", "D4", "E4", "G4", "G4", "E4", "D4", "C4",
+    "D4", "E4", "E4", "E4", "E4", "D4", "D4", "E4",
+    "D4", "C4", "C4", "C4"
+]
+
+count_on_me = [
+    # Chorus: "You can count on me like one, two, three"
+    'E4', '', 'E4', 'C4', 'E4', 'G4', 'C4', 'B3', 'E4', 'G4', 'B3', '', 'B3',
+    # "I'll be there"
+    'A3', 'A3'
+]
+
+MELODIES = {
+    "full_scale": full_scale_melody,
+    "mary_had_a_little_lamb": mary_had_a_little_lamb_melody,
+    "count_on_me": count_on_me,
+}
 
 def get_distance_for_note(note: str, mapper: SectorDistanceToNoteMapper) -> float:
     """
@@ -54,69 +78,82 @@ def convert_melody(melody: list, sectors_map: dict) -> list:
             })
     return result
 
+def parse_tempo_change(text: str) -> TempoChange:
+    """Parse a BEAT:BPM command line argument."""
+    beat, bpm = text.split(":")
+    return TempoChange(float(beat), float(bpm))
+
+def play_live(events: np.ndarray, timbres: list) -> None:
+    """Play compiled events on the sound card, timed by the audio stream's sample clock."""
+    from src.piano.tone_generator import ToneGenerator  # Needs PyAudio, the offline paths do not
+
+    # Create a ToneGenerator instance and start audio output.
+    tone_gen = ToneGenerator(num_voices=len(timbres), timbres=timbres)
+    tone_gen.start()
+    try:
+        tone_gen.play(events)
+        jitter = tone_gen.wait_for_sequence()
+        if jitter is not None:
+            print(f"Timing jitter over {jitter['events']} events: {jitter['std_ms']:.2f} ms std, "
+                  f"{jitter['peak_to_peak_ms']:.2f} ms peak to peak")
+    finally:
+        tone_gen.stop()
+
 def main():
+    parser = argparse.ArgumentParser(description="Orchestrate a melody over the piano sectors and play or render it.")
+    parser.add_argument("--melody", default="count_on_me", choices=sorted(MELODIES),
+                        help="Melody to play or render.")
+    parser.add_argument("--wav", type=str, help="Render the melody to this WAV file instead of playing it.")
+    parser.add_argument("--batch-dir", type=str,
+                        help="Render every melody to a WAV file in this directory, in parallel.")
+    parser.add_argument("--processes", type=int, help="Worker processes for --batch-dir (default: CPU count).")
+    parser.add_argument("--tempo-change", type=parse_tempo_change, action="append", default=[],
+                        metavar="BEAT:BPM", help="Change the tempo from the given note (beat) on, repeatable.")
+    args = parser.parse_args()
+
     # Load configuration from src/piano/config.yaml
-    config_path = os.path.join("src", "piano", "config.yaml")
-    config = load_config(config_path)
-    sectors_list = config.get("sectors")
-    if not sectors_list:
-        raise ValueError("No sectors found in configuration.")
+    sector_configs = load_config(CONFIG_PATH)
 
     # Create a mapping from sector name to its dedicated SectorDistanceToNoteMapper.
-    sectors_map = {}
-    for sec in sectors_list:
-        name = sec["name"]
-        mapper_conf = NoteMapperConfig(**sec["note_mapper"])  # Expecting min_range, max_range, lowest_note, highest_note.
-        # Create a SectorDistanceToNoteMapper instance for this sector.
-        mapper = SectorDistanceToNoteMapper(mapper_conf)
-        # The mapper computes its ranges internally.
-        sectors_map[name] = mapper
-
-    # Example melody in the key of C (adjust as desired)
-    full_scale_melody = [
-        "C2", "D2", "E2", "F2", "G2", "A2", "B2", "C3",
-        "D3", "E3", "F3", "G3", "A3", "B3", "C4", "D4",
-        "E4", "F4", "G4", "A4", "B4", "C5"
-    ]
-
-    mary_had_a_little_lamb_melody = [
-        "E4", "D4", "C4", "D4", "E4", "E4", "E4", "D4",
-        "D4", "D4", "E4", "G4", "G4", "E4", "D4", "C4",
-        "D4", "E4", "E4", "E4", "E4", "D4", "D4", "E4",
-        "D4", "C4", "C4", "C4"
-    ]
-    
-    count_on_me = [
-        # Chorus: "You can count on me like one, two, three"
-        'E4', '', 'E4', 'C4', 'E4', 'G4', 'C4', 'B3', 'E4', 'G4', 'B3', '', 'B3',
-        # "I'll be there"
-        'A3', 'A3'
-    ]
-    
-    melody = count_on_me
+    # The mapper computes its ranges internally.
+    sectors_map = {name: SectorDistanceToNoteMapper(conf.note_mapper) for name, conf in sector_configs.items()}
+
+    # One voice (with the sector's timbre) per sector for the offline renders
+    voices = {name: index for index, name in enumerate(sector_configs)}
+    timbres = [conf.timbre for conf in sector_configs.values()]
+
+    # One note per beat, starting at one note per note_duration
+    tempo_changes = [TempoChange(0.0, 60.0 / note_duration)] + args.tempo_change
+
+    def compile_melody(orchestration: list) -> np.ndarray:
+        return compile_sequence(orchestration_to_notes(orchestration, voices), tempo_changes, SAMPLE_RATE)
+
+    if args.batch_dir:
+        jobs = [
+            RenderJob(name, compile_melody(convert_melody(melody, sectors_map)),
+                      os.path.join(args.batch_dir, f"{name}.wav"), len(voices), timbres)
+            for name, melody in MELODIES.items()
+        ]
+        start = time.perf_counter()
+        for path in render_batch(jobs, args.processes):
+            print(f"Rendered {path}")
+        print(f"Rendered {len(jobs)} melodies in {time.perf_counter() - start:.2f} s")
+        return
+
+    melody = MELODIES[args.melody]
     orchestration = convert_melody(melody, sectors_map)
     print("Melody orchestration:")
     for item in orchestration:
         print(f"Sector: {item['sector']}, Note: {item['note']}, Distance: {item['distance']}, Frequency: {item['frequency']}")
 
-    # Create a ToneGenerator instance and start audio output.
-    tone_gen = ToneGenerator()
-    tone_gen.start()
-
-    
-    for item in orchestration:
-        freq = item["frequency"]
-        if freq is not None:
-            # Set the frequency for this note.
-            tone_gen.set_frequencies([freq])
-            print(f"Playing {item['note']} at {freq:.1f} Hz ({item['distance']:0.2f} m) on {item['sector']}")
-        else:
-            # If no mapping is found, silence the tone.
-            tone_gen.set_frequencies([])
-            print(f"Skipping note {item['note']} (no mapping)")
-        time.sleep(note_duration)
-
-    tone_gen.stop()
+    events = compile_melody(orchestration)
+    if args.wav:
+        start = time.perf_counter()
+        samples = render_sequence(events, len(voices), timbres=timbres)
+        write_wav(args.wav, samples)
+        print(f"Rendered {len(samples) / SAMPLE_RATE:.1f} s of audio to {args.wav} in {time.perf_counter() - start:.2f} s")
+    else:
+        play_live(events, timbres)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
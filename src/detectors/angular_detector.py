@@ -1,13 +1,15 @@
-import time
-import pyrealsense2 as rs
+import math
 import numpy as np
 from dataclasses import dataclass
-import cv2
 from typing import Optional
 
 from src.io.frames import FrameData
 
 MAX_RANGE_M = 3.5  # Maximum range for the bounding box in meters
+MAX_DEPTH_UNITS = int(np.iinfo(np.uint16).max)  # Largest raw depth value a frame can hold
+
+# Angle maps keyed by the intrinsics signature, see get_angle_maps()
+_ANGLE_MAP_CACHE: dict[tuple, "AngleMaps"] = {}
 
 @dataclass
 class AngularBounds:
@@ -25,7 +27,68 @@ class SectorDetection:
     min_distance_m: float
     num_valid_points: int
     azimuth_deg: float
-    valid_mask: np.ndarray  # Mask of valid points in the sector
+    valid_mask: np.ndarray  # Mask of valid points, in the coordinates of the sector's crop
+    offset: tuple[int, int] = (0, 0)  # (row, col) of the crop's top-left pixel in the frame
+    stride: int = 1  # Pixel step of the crop when the detection ran on a subsampled grid
+
+    @property
+    def roi(self) -> tuple[slice, slice]:
+        """Slices that select the detection's crop (every stride-th pixel) from a full-frame image."""
+        row, col = self.offset
+        height, width = self.valid_mask.shape
+        step = self.stride
+        return slice(row, row + (height - 1) * step + 1, step), slice(col, col + (width - 1) * step + 1, step)
+
+@dataclass
+class AngleMaps:
+    """Per-pixel ray angles for a depth stream.
+
+    The azimuth and elevation of a pixel ray only depend on the pinhole intrinsics,
+    not on the measured depth, so these are computed once per stream resolution.
+    Azimuth only varies with the column and elevation only with the row, which is
+    what lets a sector be cropped to a pixel rectangle (see get_sector_roi).
+    """
+    azimuth_deg: np.ndarray     # (height, width) float32, degrees, read-only broadcast view
+    elevation_deg: np.ndarray   # (height, width) float32, degrees, read-only broadcast view
+    azimuth_cols: np.ndarray    # (width,) float32, increasing left to right
+    elevation_rows: np.ndarray  # (height,) float32, increasing top to bottom
+
+
+def intrinsics_key(intrinsics) -> tuple:
+    """Hashable signature of the intrinsics fields that affect the pixel rays."""
+    return (intrinsics.width, intrinsics.height,
+            float(intrinsics.fx), float(intrinsics.fy),
+            float(intrinsics.ppx), float(intrinsics.ppy))
+
+
+def get_angle_maps(intrinsics) -> AngleMaps:
+    """Return the cached azimuth/elevation maps for the given intrinsics, building them if needed."""
+    key = intrinsics_key(intrinsics)
+    maps = _ANGLE_MAP_CACHE.get(key)
+    if maps is None:
+        width, height, fx, fy, ppx, ppy = key
+        # arctan2(x, z) with x = (px - ppx) * z / fx reduces to arctan((px - ppx) / fx)
+        azimuth_cols = np.rad2deg(np.arctan((np.arange(width) - ppx) / fx)).astype(np.float32)
+        elevation_rows = np.rad2deg(np.arctan((np.arange(height) - ppy) / fy)).astype(np.float32)
+        maps = store_angle_maps(intrinsics, azimuth_cols, elevation_rows)
+    return maps
+
+
+def store_angle_maps(intrinsics, azimuth_cols: np.ndarray, elevation_rows: np.ndarray) -> AngleMaps:
+    """Make the given 1D angles the cached angle maps of the intrinsics, e.g. when loaded from disk."""
+    height, width = len(elevation_rows), len(azimuth_cols)
+    # The full-frame maps are views of the 1D angles, so they take no extra memory
+    maps = AngleMaps(
+        azimuth_deg=np.broadcast_to(azimuth_cols, (height, width)),
+        elevation_deg=np.broadcast_to(elevation_rows[:, None], (height, width)),
+        azimuth_cols=azimuth_cols,
+        elevation_rows=elevation_rows,
+    )
+    # Only the active stream resolution is kept around
+    _ANGLE_MAP_CACHE.clear()
+    _ANGLE_MAP_CACHE[intrinsics_key(intrinsics)] = maps
+    return maps
+
 
 @dataclass
 class Sector:
@@ -35,63 +98,62 @@ class Sector:
     bounds: AngularBounds
 
     def detect(self, frame_data: FrameData) -> Optional[SectorDetection]:
-        return get_angular_detection(frame_data, self.bounds, self.name, self.color)
+        return get_angular_detection(frame_data, self.bounds)
 
 
-def get_angular_detection(frame_data: FrameData, bounds: AngularBounds, name: str, color: tuple[int, int, int]) -> Optional[SectorDetection]:
-    """Detect points within an angular sector."""
-    height, width = frame_data.depth_image.shape
-    depths = frame_data.depth_image.astype(float) / 1000.0  # Convert to meters
+def get_sector_roi(angle_maps: AngleMaps, bounds: AngularBounds) -> Optional[tuple[slice, slice]]:
+    """Tight (rows, cols) pixel rectangle covering the sector's angular bounds, or None if off-frame.
 
-    # Create coordinate grid
-    px, py = np.meshgrid(np.arange(width), np.arange(height))
-    
-    # Convert image coordinates to 3D rays using intrinsics
-    fx = frame_data.depth_intrinsics.fx
-    fy = frame_data.depth_intrinsics.fy
-    ppx = frame_data.depth_intrinsics.ppx
-    ppy = frame_data.depth_intrinsics.ppy
-    
-    x = (px - ppx) * depths / fx
-    y = (py - ppy) * depths / fy
-    z = depths
-    
-    # Calculate angles
-    azimuth = np.rad2deg(np.arctan2(x, z))
-    elevation = np.rad2deg(np.arctan2(y, z))
-    
-    # Create sector mask
+    Every pixel inside the rectangle lies within the bounds, so no per-pixel angle test is needed.
+    """
     half_az_span = bounds.azimuth_span / 2
     half_el_span = bounds.elevation_span / 2
-    
-    valid_mask = (depths > bounds.min_range) & (depths < bounds.max_range) & \
-                (azimuth >= bounds.azimuth_center - half_az_span) & \
-                (azimuth <= bounds.azimuth_center + half_az_span) & \
-                (elevation >= bounds.elevation_center - half_el_span) & \
-                (elevation <= bounds.elevation_center + half_el_span)
+    col_start = np.searchsorted(angle_maps.azimuth_cols, bounds.azimuth_center - half_az_span, side='left')
+    col_stop = np.searchsorted(angle_maps.azimuth_cols, bounds.azimuth_center + half_az_span, side='right')
+    row_start = np.searchsorted(angle_maps.elevation_rows, bounds.elevation_center - half_el_span, side='left')
+    row_stop = np.searchsorted(angle_maps.elevation_rows, bounds.elevation_center + half_el_span, side='right')
+    if col_start >= col_stop or row_start >= row_stop:
+        return None
+    return slice(int(row_start), int(row_stop)), slice(int(col_start), int(col_stop))
+
+
+def get_depth_unit_range(bounds: AngularBounds, depth_scale: float) -> tuple[int, int]:
+    """Convert the sector's metre range into exclusive raw depth-unit limits.
+
+    For integer depth values, raw > low and raw < high is the same test as
+    min_range < raw * depth_scale < max_range, without converting the frame to meters.
+    """
+    low = math.floor(bounds.min_range / depth_scale)
+    high = math.ceil(bounds.max_range / depth_scale)
+    return min(max(low, 0), MAX_DEPTH_UNITS), min(max(high, 0), MAX_DEPTH_UNITS)
+
+
+def get_angular_detection(frame_data: FrameData, bounds: AngularBounds) -> Optional[SectorDetection]:
+    """Detect points within an angular sector.
+
+    Only the sector's pixel rectangle is processed; the returned mask is in crop coordinates.
+    The frame is not modified, see SectorOverlayRenderer to visualize the result.
+    """
+    # Ray angles only depend on the intrinsics, so reuse the cached maps
+    angle_maps = get_angle_maps(frame_data.depth_intrinsics)
+    roi = get_sector_roi(angle_maps, bounds)
+    if roi is None:
+        return None
+
+    # Threshold the raw depth units directly, only the final min is converted to meters
+    low, high = get_depth_unit_range(bounds, frame_data.depth_scale)
+    depths = frame_data.depth_image[roi]
+    valid_mask = (depths > low) & (depths < high)
     
     if not np.any(valid_mask):
         return None
     
-    # Draw sector overlay
-    depth_points = depths[valid_mask]
-    min_distance = np.min(depth_points)
-    
-    # Visualize sector
-    intensity = np.clip((1.0 - depth_points/bounds.max_range) * 255, 0, 255).astype(np.uint8)
-    overlay = frame_data.color_image_rgb.copy()
-    overlay[valid_mask] = tuple(int(c * 0.7) for c in color)  # Sector color at 70% intensity
-    
-    # Blend with original image
-    alpha = 0.3
-    frame_data.color_image_rgb[:] = cv2.addWeighted(
-        frame_data.color_image_rgb, 1 - alpha,
-        overlay, alpha, 0
-    )
+    min_distance = float(np.min(depths[valid_mask])) * frame_data.depth_scale
     
     return SectorDetection(
         min_distance_m=min_distance,
         num_valid_points=np.count_nonzero(valid_mask),
         azimuth_deg=bounds.azimuth_center,
-        valid_mask=valid_mask
-    )
\ No newline at end of file
+        valid_mask=valid_mask,
+        offset=(roi[0].start, roi[1].start)
+    )
@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from src.io.frames import FrameData
+
+
+class FrameRing:
+    """Small bounded ring of captured frames that always hands out the newest one.
+
+    Pushing into a full ring drops the oldest frame, and taking a frame discards any
+    older ones still waiting, so a slow consumer never builds up a backlog of stale
+    frames. Both kinds of drop are counted in `dropped`.
+    """
+
+    def __init__(self, capacity: int = 2):
+        if capacity < 1:
+            raise ValueError("FrameRing capacity must be at least 1.")
+        self._frames: deque = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._closed = False
+        self.captured = 0  # Frames pushed by the producer
+        self.dropped = 0   # Frames that were never handed to the consumer
+
+    def put(self, frame: FrameData) -> None:
+        """Add a frame, dropping the oldest one if the ring is full."""
+        with self._condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self.captured += 1
+            self._condition.notify()
+
+    def get_latest(self, timeout: Optional[float] = None) -> Optional[FrameData]:
+        """Wait for a frame and return the newest one, or None on timeout or once closed."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._frames or self._closed, timeout)
+            if not self._frames:
+                return None
+            frame = self._frames.pop()
+            self.dropped += len(self._frames)
+            self._frames.clear()
+            return frame
+
+    def close(self) -> None:
+        """Wake up any waiting consumer; get_latest returns None once the ring is empty."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """Producer thread that keeps reading frames into a FrameRing.
+
+    `read_frame` is any callable returning a FrameData (or None to skip), for example
+    `lambda: get_color_and_depth_frames(pipeline, align, depth_scale)`. An exception in
+    the producer stops the thread, closes the ring and is kept in `error`.
+    """
+
+    def __init__(self, read_frame: Callable[[], Optional[FrameData]], ring: FrameRing):
+        super().__init__(name="frame-capture", daemon=True)
+        self.read_frame = read_frame
+        self.ring = ring
+        self.error: Optional[BaseException] = None
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                frame = self.read_frame()
+                if frame is not None:
+                    self.ring.put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ring.close()
+
+    def stop(self, timeout: Optional[float] = 2.0) -> None:
+        """Ask the producer to finish and wait for it."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
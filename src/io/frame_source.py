@@ -0,0 +1,308 @@
+"""
+Frame sources for the piano loop.
+
+A FrameSource hands out FrameData from a live RealSense camera (or .bag file) or from a
+recording made with FrameRecorder. Recordings are a directory with a small JSON header
+and chunked .npy files that are memory-mapped on replay, so frames are handed out as
+zero-copy views and no librealsense install or camera is needed:
+
+    recording.json          intrinsics, depth scale, frame shapes and chunk list
+    timestamps_00000.npy    (chunk_frames,) float64 camera timestamps in milliseconds
+    depth_00000.npy         (chunk_frames, height, width) uint16
+    color_00000.npy         (chunk_frames, height, width, 3) uint8, only with color
+
+Chunks are preallocated and the header is rewritten whenever a chunk is opened. A
+frame's timestamp is written after its images and unused rows keep a NaN timestamp,
+so a recording cut short by a crash still replays up to its last complete frame.
+close() records the frame counts and cuts the last chunk down to the frames it holds.
+"""
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from typing import List, Optional
+import numpy as np
+
+from src.io.frames import CameraIntrinsics, FrameData, get_depth_frames, get_depth_scale, start_pipeline
+
+RECORDING_VERSION = 2
+RECORDING_HEADER = "recording.json"
+CHUNK_FRAMES = 300  # Frames per chunk file, about 550 MB of depth at 1280x720
+
+
+def _shrink_npy(path: str, rows: int) -> None:
+    """Cut a preallocated .npy file down to its first `rows` rows, in place.
+
+    The shorter shape is padded to the old header length, so the data stays where it is
+    and only the unused tail of the file is truncated.
+    """
+    with open(path, "r+b") as file:
+        version = np.lib.format.read_magic(file)
+        header_start = file.tell() + (2 if version == (1, 0) else 4)  # After the header length field
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        data_start = file.tell()
+        header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran_order,
+                       "shape": (rows, *shape[1:])})
+        file.seek(header_start)
+        file.write(header.ljust(data_start - header_start - 1).encode("latin1") + b"\n")
+        file.truncate(data_start + rows * int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize)
+
+
+class FrameSource(ABC):
+    """Something that produces FrameData, started and stopped around the piano loop."""
+
+    def start(self) -> None:
+        """Open the underlying device or file."""
+
+    @abstractmethod
+    def read(self) -> Optional[FrameData]:
+        """Return the next frame, None if none is available yet; raise EOFError at the end."""
+
+    def stop(self) -> None:
+        """Release the underlying device or file."""
+
+    def set_use_color(self, use_color: bool) -> None:
+        """Hint whether frames need a color image; sources that cannot skip it ignore this."""
+
+    def __enter__(self) -> "FrameSource":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class RealSenseFrameSource(FrameSource):
+    """Live camera or .bag replay through librealsense, see start_pipeline."""
+
+    def __init__(self, bag_file: Optional[str] = None, enable_color: bool = True,
+                 align_depth: bool = True, decimation: int = 1):
+        self.bag_file = bag_file
+        self.enable_color = enable_color
+        self.align_depth = align_depth
+        self.decimation = decimation
+        self._pipeline = None
+        self._read_frame = None
+        self._read_depth = None
+        self._use_color = True
+
+    def start(self) -> None:
+        self._pipeline, self._read_frame = start_pipeline(
+            self.bag_file, enable_color=self.enable_color,
+            align_depth=self.align_depth, decimation=self.decimation
+        )
+        if self.align_depth and self.enable_color:
+            # Without color there is nothing to align to, so read native depth instead
+            depth_scale = get_depth_scale(self._pipeline.get_active_profile())
+            self._read_depth = lambda: get_depth_frames(self._pipeline, depth_scale)
+
+    def set_use_color(self, use_color: bool) -> None:
+        """Skip color and depth-to-color alignment while use_color is False.
+
+        Only aligned streams change: their frames switch to native depth geometry, which
+        the detector recompiles for on the next frame.
+        """
+        self._use_color = use_color
+
+    def read(self) -> Optional[FrameData]:
+        if not self._use_color and self._read_depth is not None:
+            return self._read_depth()
+        return self._read_frame()
+
+    def stop(self) -> None:
+        if self._pipeline is not None:
+            self._pipeline.stop()
+            self._pipeline = None
+            self._read_depth = None
+
+
+class FrameRecorder:
+    """Writes frames into a chunked, memory-mappable recording directory."""
+
+    def __init__(self, path: str, record_color: bool = False, chunk_frames: int = CHUNK_FRAMES):
+        self.path = path
+        self.record_color = record_color
+        self.chunk_frames = chunk_frames
+        self._header = None
+        self._chunks: List[dict] = []
+        self._depth_chunk = None
+        self._color_chunk = None
+        self._timestamp_chunk = None
+        self._chunk_count = 0
+
+    def _get_color(self, frame_data: FrameData) -> Optional[np.ndarray]:
+        if not self.record_color:
+            return None
+        if frame_data.color_image is None and frame_data.color_loader is not None:
+            frame_data.color_image = frame_data.color_loader()
+        return frame_data.color_image
+
+    def _start(self, frame_data: FrameData) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        has_color = self._get_color(frame_data) is not None
+        self._header = {
+            "version": RECORDING_VERSION,
+            "depth_intrinsics": asdict(CameraIntrinsics.from_rs(frame_data.depth_intrinsics)),
+            "depth_scale": frame_data.depth_scale,
+            "depth_shape": list(frame_data.depth_image.shape),
+            "color_shape": list(frame_data.color_image.shape) if has_color else None,
+            "chunk_frames": self.chunk_frames,
+            "chunks": self._chunks,
+        }
+
+    def _write_header(self) -> None:
+        """Replace the header atomically, so a reader never sees a half-written one."""
+        path = os.path.join(self.path, RECORDING_HEADER)
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(self._header, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _open_chunk(self) -> None:
+        self._flush_chunk()
+        index = len(self._chunks)
+        # No "frames" yet: until close() the reader counts the timestamped rows
+        chunk = {"depth": f"depth_{index:05d}.npy", "timestamps": f"timestamps_{index:05d}.npy"}
+        self._timestamp_chunk = np.lib.format.open_memmap(
+            os.path.join(self.path, chunk["timestamps"]), mode="w+", dtype=np.float64,
+            shape=(self.chunk_frames,)
+        )
+        self._timestamp_chunk.fill(np.nan)
+        self._depth_chunk = np.lib.format.open_memmap(
+            os.path.join(self.path, chunk["depth"]), mode="w+", dtype=np.uint16,
+            shape=(self.chunk_frames, *self._header["depth_shape"])
+        )
+        if self._header["color_shape"] is not None:
+            chunk["color"] = f"color_{index:05d}.npy"
+            self._color_chunk = np.lib.format.open_memmap(
+                os.path.join(self.path, chunk["color"]), mode="w+", dtype=np.uint8,
+                shape=(self.chunk_frames, *self._header["color_shape"])
+            )
+        self._chunks.append(chunk)
+        self._chunk_count = 0
+        self._write_header()
+
+    def _flush_chunk(self) -> None:
+        """Flush the open chunk and record its frame count for the header."""
+        for chunk in (self._depth_chunk, self._color_chunk, self._timestamp_chunk):
+            if chunk is not None:
+                chunk.flush()
+        self._depth_chunk = self._color_chunk = self._timestamp_chunk = None
+        if self._chunks:
+            self._chunks[-1]["frames"] = self._chunk_count
+
+    def write(self, frame_data: FrameData) -> None:
+        """Append a frame; all frames of a recording must share the same intrinsics."""
+        if self._header is None:
+            self._start(frame_data)
+        elif list(frame_data.depth_image.shape) != self._header["depth_shape"]:
+            raise ValueError("All frames of a recording must have the same depth resolution.")
+        if self._depth_chunk is None or self._chunk_count == self.chunk_frames:
+            self._open_chunk()
+
+        self._depth_chunk[self._chunk_count] = frame_data.depth_image
+        if self._color_chunk is not None:
+            self._color_chunk[self._chunk_count] = self._get_color(frame_data)
+        self._timestamp_chunk[self._chunk_count] = frame_data.timestamp_ms  # Marks the frame complete
+        self._chunk_count += 1
+
+    def close(self) -> None:
+        """Flush the last chunk, cut it down to its frames and write the final header."""
+        if self._header is None or self._depth_chunk is None:
+            return
+        self._flush_chunk()
+        chunk = self._chunks[-1]
+        if chunk["frames"] < self.chunk_frames:
+            for name in ("depth", "color", "timestamps"):
+                if name in chunk:
+                    _shrink_npy(os.path.join(self.path, chunk[name]), chunk["frames"])
+        self._write_header()
+
+    def __enter__(self) -> "FrameRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RecordingFrameSource(FrameSource):
+    """Replays a FrameRecorder recording as zero-copy views of the memory-mapped chunks.
+
+    With realtime=True frames are paced by their recorded timestamps, otherwise they are
+    returned as fast as the caller reads them. With loop=True the recording restarts at
+    the end instead of raising EOFError.
+    """
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self._depth_chunks: List[np.ndarray] = []
+        self._color_chunks: List[Optional[np.ndarray]] = []
+        self._frame_index = []  # (chunk, row) for every frame
+
+    def start(self) -> None:
+        with open(os.path.join(self.path, RECORDING_HEADER), "r") as file:
+            header = json.load(file)
+        if header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version: {header.get('version')}")
+
+        self.depth_intrinsics = CameraIntrinsics(**header["depth_intrinsics"])
+        self.depth_scale = header["depth_scale"]
+        self._depth_chunks = []
+        self._color_chunks = []
+        self._frame_index = []
+        timestamps = []
+        for chunk_number, chunk in enumerate(header["chunks"]):
+            chunk_timestamps = np.load(os.path.join(self.path, chunk["timestamps"]))
+            frames = chunk.get("frames")
+            if frames is None:
+                # Not closed, the frames up to the first missing timestamp are complete
+                missing = np.flatnonzero(np.isnan(chunk_timestamps))
+                frames = int(missing[0]) if len(missing) else len(chunk_timestamps)
+            timestamps.append(chunk_timestamps[:frames])
+            self._depth_chunks.append(np.load(os.path.join(self.path, chunk["depth"]), mmap_mode="r"))
+            color = chunk.get("color")
+            self._color_chunks.append(np.load(os.path.join(self.path, color), mmap_mode="r") if color else None)
+            self._frame_index.extend((chunk_number, row) for row in range(frames))
+        self.timestamps_ms = np.concatenate(timestamps) if timestamps else np.empty(0)
+        self._position = 0
+        self._start_wall = None
+
+    def __len__(self) -> int:
+        return len(self._frame_index)
+
+    def read(self) -> Optional[FrameData]:
+        if self._position >= len(self._frame_index):
+            if not self.loop or not self._frame_index:
+                raise EOFError("End of recording.")
+            self._position = 0
+            self._start_wall = None
+
+        position = self._position
+        if self.realtime:
+            # Sleep until the frame is due relative to the first frame of this pass
+            offset_s = (self.timestamps_ms[position] - self.timestamps_ms[0]) / 1000.0
+            if self._start_wall is None:
+                self._start_wall = time.monotonic() - offset_s
+            delay = self._start_wall + offset_s - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        chunk_number, row = self._frame_index[position]
+        color_chunk = self._color_chunks[chunk_number]
+        self._position += 1
+        return FrameData(
+            depth_image=self._depth_chunks[chunk_number][row],
+            depth_intrinsics=self.depth_intrinsics,
+            depth_scale=self.depth_scale,
+            timestamp_ms=float(self.timestamps_ms[position]),
+            color_image=color_chunk[row] if color_chunk is not None else None
+        )
+
+    def stop(self) -> None:
+        self._depth_chunks = []
+        self._color_chunks = []
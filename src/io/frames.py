@@ -1,25 +1,102 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
 import numpy as np
-import cv2
-import pyrealsense2 as rs
+
+# pyrealsense2 is imported on first use by _import_realsense(): replaying recordings (see
+# src/io/frame_source.py) works without librealsense, and offline tools skip its import cost
+rs = None
+
+DEFAULT_DEPTH_SCALE = 0.001  # Meters per depth unit used by most RealSense cameras
 
 # Add this with the other imports at the top
 @dataclass
 class FrameData:
-    color_image_rgb: np.ndarray
-    depth_image: np.ndarray
-    depth_colormap_image: np.ndarray
-    depth_intrinsics: rs.intrinsics
+    """One captured frame.
+
+    The images are kept as zero-copy views of the librealsense buffers (the frameset is
+    held so they stay valid). Derived images are only computed on first access and then
+    memoized for this frame, so loops that never display anything never pay for them.
+    """
+    depth_image: np.ndarray  # Raw uint16 depth units, multiply by depth_scale for meters
+    depth_intrinsics: "rs.intrinsics"  # Or any object with the same pinhole fields, e.g. CameraIntrinsics
+    depth_scale: float = DEFAULT_DEPTH_SCALE
+    timestamp_ms: float = 0.0  # Camera timestamp of the frame in milliseconds
+    color_image: Optional[np.ndarray] = None  # Color image as delivered by the camera (BGR)
+    frameset: Any = field(default=None, repr=False, compare=False)  # Owner of the raw buffers
+    # Produces color_image on demand, e.g. aligning color to depth only when rendering
+    color_loader: Optional[Callable[[], Optional[np.ndarray]]] = field(default=None, repr=False, compare=False)
+    # Durations of the capture sub-stages in milliseconds, e.g. {"wait": ..., "align": ...}
+    stage_ms: Dict[str, float] = field(default_factory=dict, repr=False, compare=False)
+
+    @cached_property
+    def color_image_rgb(self) -> np.ndarray:
+        """Color image converted to RGB, or the depth colormap when there is no color image."""
+        if self.color_image is None and self.color_loader is not None:
+            self.color_image = self.color_loader()
+        if self.color_image is None:
+            return self.depth_colormap_image
+        import cv2  # Only loaded once something is displayed
+        return cv2.cvtColor(self.color_image, cv2.COLOR_BGR2RGB)
+
+    @cached_property
+    def depth_colormap_image(self) -> np.ndarray:
+        """Depth image normalized and colored with the JET colormap."""
+        import cv2  # Only loaded once something is displayed
+        depth_colormap = cv2.normalize(self.depth_image, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+        return cv2.applyColorMap(depth_colormap, cv2.COLORMAP_JET)
+
+@dataclass(frozen=True)
+class CameraIntrinsics:
+    """Plain copy of the pinhole fields of rs.intrinsics that can be pickled and shared."""
+    width: int
+    height: int
+    fx: float
+    fy: float
+    ppx: float
+    ppy: float
+
+    @classmethod
+    def from_rs(cls, intrinsics) -> "CameraIntrinsics":
+        return cls(intrinsics.width, intrinsics.height, intrinsics.fx, intrinsics.fy,
+                   intrinsics.ppx, intrinsics.ppy)
+
+def _import_realsense():
+    """Import pyrealsense2 into the module's `rs` the first time a camera is used."""
+    global rs
+    if rs is None:
+        import pyrealsense2
+        rs = pyrealsense2
+    return rs
+
+def make_depth_filters(decimation: int = 1) -> list:
+    """librealsense post-processing filters applied to native depth frames."""
+    filters = []
+    if decimation > 1:
+        _import_realsense()
+        decimation_filter = rs.decimation_filter()
+        decimation_filter.set_option(rs.option.filter_magnitude, decimation)
+        filters.append(decimation_filter)
+    return filters
+
+def get_depth_scale(pipeline_profile) -> float:
+    """Read the meters-per-unit scale of the depth sensor behind a started pipeline."""
+    return pipeline_profile.get_device().first_depth_sensor().get_depth_scale()
 
 # Then modify the get_color_and_depth_frames function:
-def get_color_and_depth_frames(pipeline, align) -> FrameData:
+def get_color_and_depth_frames(pipeline, align, depth_scale: float = DEFAULT_DEPTH_SCALE) -> FrameData:
     """Get aligned color and depth frames from the RealSense camera.
     
     Returns:
-        FrameData: Contains color image (RGB), depth image, colored depth map, and depth intrinsics
+        FrameData: Contains color image, depth image and depth intrinsics; the RGB and
+        colored depth map images are computed lazily on first access
     """
+    start = time.perf_counter()
     frames = pipeline.wait_for_frames()
+    waited = time.perf_counter()
     aligned_frames = align.process(frames)
+    aligned = time.perf_counter()
     aligned_depth_frame = aligned_frames.get_depth_frame()
     #depth_intrinsics = depth_frame.profile.as_video_stream_profile().intrinsics
     # Get intrinsics from aligned depth frame
@@ -31,14 +108,97 @@ def get_color_and_depth_frames(pipeline, align) -> FrameData:
 
     color_image = np.asanyarray(color_frame.get_data())
     depth_image = np.asanyarray(aligned_depth_frame.get_data())
-
-    depth_colormap = cv2.normalize(depth_image, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-    depth_colormap_image = cv2.applyColorMap(depth_colormap, cv2.COLORMAP_JET)
-    color_image_rgb = cv2.cvtColor(color_image, cv2.COLOR_BGR2RGB)
     
     return FrameData(
-        color_image_rgb=color_image_rgb,
         depth_image=depth_image,
-        depth_colormap_image=depth_colormap_image,
-        depth_intrinsics=depth_intrinsics
-    )
\ No newline at end of file
+        depth_intrinsics=depth_intrinsics,
+        depth_scale=depth_scale,
+        timestamp_ms=frames.get_timestamp(),
+        color_image=color_image,
+        frameset=aligned_frames,
+        stage_ms={"wait": (waited - start) * 1000.0, "align": (aligned - waited) * 1000.0}
+    )
+
+def get_depth_frames(pipeline, depth_scale: float = DEFAULT_DEPTH_SCALE,
+                     depth_filters: Sequence = (), color_align=None) -> FrameData:
+    """Get a depth frame in its native (unaligned) geometry from the RealSense camera.
+
+    The depth frame is passed through `depth_filters` (see make_depth_filters) and the
+    intrinsics are read from the filtered frame. If `color_align` is an
+    `rs.align(rs.stream.depth)`, the color frame is only aligned to the depth frame when
+    the color image is first accessed, so loops that never render skip alignment entirely.
+    """
+    start = time.perf_counter()
+    frames = pipeline.wait_for_frames()
+    waited = time.perf_counter()
+    depth_frame = frames.get_depth_frame()
+    if not depth_frame:
+        return None
+
+    for depth_filter in depth_filters:
+        depth_frame = depth_filter.process(depth_frame)
+    depth_frame = depth_frame.as_depth_frame()
+    stage_ms = {"wait": (waited - start) * 1000.0}
+    if depth_filters:
+        stage_ms["filter"] = (time.perf_counter() - waited) * 1000.0
+    depth_intrinsics = depth_frame.profile.as_video_stream_profile().get_intrinsics()
+
+    color_loader = None
+    if color_align is not None:
+        def color_loader():
+            color_frame = color_align.process(frames).get_color_frame()
+            return np.asanyarray(color_frame.get_data()) if color_frame else None
+
+    return FrameData(
+        depth_image=np.asanyarray(depth_frame.get_data()),
+        depth_intrinsics=depth_intrinsics,
+        depth_scale=depth_scale,
+        timestamp_ms=frames.get_timestamp(),
+        frameset=(frames, depth_frame),
+        color_loader=color_loader,
+        stage_ms=stage_ms
+    )
+
+
+def start_pipeline(bag_file: Optional[str] = None, enable_color: bool = True,
+                   align_depth: bool = True, decimation: int = 1):
+    """Start the RealSense pipeline and build the matching frame reader.
+
+    Returns:
+        (pipeline, read_frame): read_frame() returns the next FrameData (or None), either
+        aligned to color (get_color_and_depth_frames) or in native depth space
+        (get_depth_frames) when align_depth is False
+    """
+    _import_realsense()
+    pipeline = rs.pipeline()
+    config = rs.config()
+    if bag_file:
+        rs.config.enable_device_from_file(config, bag_file)
+    
+    config.enable_stream(rs.stream.depth)
+    if enable_color:
+        config.enable_stream(rs.stream.color)
+    pipeline_profile = pipeline.start(config)
+    
+    depth_stream = pipeline_profile.get_stream(rs.stream.depth).as_video_stream_profile()
+    depth_intrinsics = depth_stream.get_intrinsics()
+    depth_scale = get_depth_scale(pipeline_profile)
+
+    print(f"Depth: {depth_intrinsics.width}x{depth_intrinsics.height} @ {depth_stream.fps()} FPS, "
+          f"{depth_scale * 1000:.3f} mm/unit")
+    if enable_color:
+        color_stream = pipeline_profile.get_stream(rs.stream.color).as_video_stream_profile()
+        color_intrinsics = color_stream.get_intrinsics()
+        print(f"Color: {color_intrinsics.width}x{color_intrinsics.height} @ {color_stream.fps()} FPS")
+
+    if align_depth and enable_color:
+        align = rs.align(rs.stream.color)
+        read_frame = lambda: get_color_and_depth_frames(pipeline, align, depth_scale)
+    else:
+        # Detect on the native depth stream. Color is aligned to depth only when the
+        # overlay is rendered, and not at all when decimating (the geometries differ,
+        # so the overlay is drawn on the depth colormap instead).
+        depth_filters = make_depth_filters(decimation)
+        color_align = rs.align(rs.stream.depth) if enable_color and decimation <= 1 else None
+        read_frame = lambda: get_depth_frames(pipeline, depth_scale, depth_filters, color_align)
+    return pipeline, read_frame
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+from typing import Optional
+import numpy as np
+
+from src.io.frames import CameraIntrinsics, FrameData
+
+
+@dataclass(frozen=True)
+class SharedFrameLayout:
+    """Describes a SharedFrameRing so that other processes can attach to it by name."""
+    name: str
+    slots: int
+    depth_shape: tuple[int, int]
+    color_shape: Optional[tuple[int, int, int]] = None  # None when color is not shared
+
+    @property
+    def depth_nbytes(self) -> int:
+        return int(np.prod(self.depth_shape)) * np.dtype(np.uint16).itemsize
+
+    @property
+    def color_nbytes(self) -> int:
+        return int(np.prod(self.color_shape)) if self.color_shape else 0
+
+    @property
+    def slot_nbytes(self) -> int:
+        return self.depth_nbytes + self.color_nbytes
+
+
+@dataclass(frozen=True)
+class FrameSlot:
+    """Small message announcing that a slot of the ring holds a new frame."""
+    slot: int
+    sequence: int
+    depth_intrinsics: CameraIntrinsics
+    depth_scale: float
+    has_color: bool
+
+
+class SharedFrameRing:
+    """Fixed slots of depth (and optionally color) images in one shared memory block.
+
+    Frames are copied into a slot once by the producer; every other process reads them
+    as numpy views of the same memory, so no image data is ever pickled. Which process
+    owns which slot is handled by the caller by passing FrameSlot messages around.
+    """
+
+    def __init__(self, layout: SharedFrameLayout, shm: shared_memory.SharedMemory):
+        self.layout = layout
+        self._shm = shm
+
+    @classmethod
+    def create(cls, slots: int, depth_shape: tuple, color_shape: Optional[tuple] = None) -> "SharedFrameRing":
+        """Allocate a new ring, the creator is responsible for calling unlink()."""
+        layout = SharedFrameLayout("", slots, tuple(depth_shape), tuple(color_shape) if color_shape else None)
+        shm = shared_memory.SharedMemory(create=True, size=layout.slot_nbytes * slots)
+        return cls(replace(layout, name=shm.name), shm)
+
+    @classmethod
+    def attach(cls, layout: SharedFrameLayout) -> "SharedFrameRing":
+        """Attach to a ring created by another process."""
+        return cls(layout, shared_memory.SharedMemory(name=layout.name))
+
+    def depth_view(self, slot: int) -> np.ndarray:
+        offset = slot * self.layout.slot_nbytes
+        return np.ndarray(self.layout.depth_shape, dtype=np.uint16, buffer=self._shm.buf, offset=offset)
+
+    def color_view(self, slot: int) -> Optional[np.ndarray]:
+        if self.layout.color_shape is None:
+            return None
+        offset = slot * self.layout.slot_nbytes + self.layout.depth_nbytes
+        return np.ndarray(self.layout.color_shape, dtype=np.uint8, buffer=self._shm.buf, offset=offset)
+
+    def write(self, slot: int, sequence: int, frame_data: FrameData) -> FrameSlot:
+        """Copy a frame into a slot and return the message describing it."""
+        np.copyto(self.depth_view(slot), frame_data.depth_image)
+        has_color = self.layout.color_shape is not None and frame_data.color_image is not None
+        if has_color:
+            np.copyto(self.color_view(slot), frame_data.color_image)
+        return FrameSlot(
+            slot=slot,
+            sequence=sequence,
+            depth_intrinsics=CameraIntrinsics.from_rs(frame_data.depth_intrinsics),
+            depth_scale=frame_data.depth_scale,
+            has_color=has_color
+        )
+
+    def read(self, frame_slot: FrameSlot) -> FrameData:
+        """FrameData whose images are views of the slot (valid until the slot is reused)."""
+        return FrameData(
+            depth_image=self.depth_view(frame_slot.slot),
+            depth_intrinsics=frame_slot.depth_intrinsics,
+            depth_scale=frame_slot.depth_scale,
+            color_image=self.color_view(frame_slot.slot) if frame_slot.has_color else None
+        )
+
+    def close(self) -> None:
+        self._shm.close()
+
+    def unlink(self) -> None:
+        self._shm.unlink()
@@ -0,0 +1,229 @@
+"""
+Synthetic depth scenes for load testing the detector without a camera.
+
+The room is a floor plane, a back wall and two side walls seen from a camera at waist
+height. Players are vertical cylinders walking back and forth along the configured
+sector rays. Everything static (room, sensor noise, holes) is rendered once into a small
+bank of noisy background frames, so a frame only costs one copy plus the players'
+bounding boxes.
+"""
+import math
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+
+from src.io.frames import CameraIntrinsics, DEFAULT_DEPTH_SCALE, FrameData
+from src.io.frame_source import FrameSource
+from src.detectors.angular_detector import Sector, get_angle_maps, get_depth_unit_range, get_sector_roi
+
+D435_DEPTH_HFOV_DEG = 87.0  # Horizontal field of view of the D435 depth stream
+NOISE_BANK_SIZE = 8  # Distinct noisy background frames that are cycled through
+
+
+class SyntheticDepthScene(FrameSource):
+    """Renders synthetic depth frames with ground-truth per-sector min distances.
+
+    `read()` returns the next FrameData (depth only, so overlays fall back to the depth
+    colormap) and stores the matching ground truth in `last_ground_truth_m`: the min
+    distance in meters of each sector's visible, noise and hole free depth within its
+    range, or NaN when nothing is in range. Frames are produced as fast as they are read
+    unless realtime=True, which paces them at `fps`.
+    """
+
+    def __init__(self, sectors: List[Sector], width: int = 1280, height: int = 720,
+                 num_players: Optional[int] = None, fps: float = 30.0,
+                 hfov_deg: float = D435_DEPTH_HFOV_DEG, camera_height_m: float = 0.9,
+                 wall_distance_m: float = 4.5, room_half_width_m: float = 3.0,
+                 player_radius_m: float = 0.2, player_height_m: float = 1.7,
+                 noise_std_m: float = 0.004, hole_fraction: float = 0.02,
+                 depth_scale: float = DEFAULT_DEPTH_SCALE, seed: int = 0, realtime: bool = False):
+        self.sectors = list(sectors)
+        self.fps = fps
+        self.realtime = realtime
+        self.camera_height_m = camera_height_m
+        self.player_radius_m = player_radius_m
+        self.player_height_m = player_height_m
+        self.depth_scale = depth_scale
+        self._rng = np.random.default_rng(seed)
+
+        fx = (width / 2) / math.tan(math.radians(hfov_deg / 2))
+        self.intrinsics = CameraIntrinsics(width, height, fx, fx, (width - 1) / 2, (height - 1) / 2)
+        # Normalized ray directions per column and row (x right, y down, z forward)
+        self._ray_x = (np.arange(width) - self.intrinsics.ppx) / fx
+        self._ray_y = (np.arange(height) - self.intrinsics.ppy) / fx
+
+        clean = self._render_room(wall_distance_m, room_half_width_m)
+        self._background_units = self._to_units(clean)
+        self._noise_bank = self._render_noise_bank(clean, noise_std_m, hole_fraction)
+
+        # Sector crops and depth-unit limits, used for the ground truth
+        angle_maps = get_angle_maps(self.intrinsics)
+        self._rois = [get_sector_roi(angle_maps, sector.bounds) for sector in self.sectors]
+        self._unit_ranges = [get_depth_unit_range(sector.bounds, depth_scale) for sector in self.sectors]
+
+        # Players walk along the sector rays between the sector's range limits
+        self.num_players = len(self.sectors) if num_players is None else num_players
+        num_players = self.num_players
+        self._player_sector = np.arange(num_players) % max(len(self.sectors), 1)
+        self._player_speed_hz = self._rng.uniform(0.05, 0.2, num_players)
+        self._player_phase = self._rng.uniform(0, 2 * np.pi, num_players)
+        self._frame_index = 0
+        self._start_wall = None
+        self.last_ground_truth_m: Optional[np.ndarray] = None
+
+    def _to_units(self, depth_m: np.ndarray) -> np.ndarray:
+        units = np.rint(depth_m / self.depth_scale)
+        return np.clip(units, 0, np.iinfo(np.uint16).max).astype(np.uint16)
+
+    def _render_room(self, wall_distance_m: float, room_half_width_m: float) -> np.ndarray:
+        """Clean z-depth in meters of the floor, back wall and side walls."""
+        ray_x = self._ray_x[None, :]
+        ray_y = self._ray_y[:, None]
+        with np.errstate(divide="ignore"):
+            floor = np.where(ray_y > 0, self.camera_height_m / ray_y, np.inf)
+            side_walls = np.where(ray_x != 0, room_half_width_m / np.abs(ray_x), np.inf)
+        return np.minimum(np.minimum(floor, side_walls), wall_distance_m).astype(np.float32)
+
+    def _render_noise_bank(self, clean: np.ndarray, noise_std_m: float, hole_fraction: float) -> np.ndarray:
+        """Noisy copies of the room with dropouts; stereo depth noise grows with z squared."""
+        bank = np.empty((NOISE_BANK_SIZE, *clean.shape), dtype=np.uint16)
+        for index in range(NOISE_BANK_SIZE):
+            noisy = clean + self._rng.standard_normal(clean.shape, dtype=np.float32) * (noise_std_m * clean ** 2)
+            bank[index] = self._to_units(noisy)
+            bank[index][self._rng.random(clean.shape) < hole_fraction] = 0
+        return bank
+
+    def _player_positions(self, t: float) -> np.ndarray:
+        """(num_players, 2) x/z floor positions of the players at time t."""
+        positions = np.empty((len(self._player_sector), 2))
+        for player, sector_id in enumerate(self._player_sector):
+            bounds = self.sectors[sector_id].bounds
+            # The player's front surface stays within the sector's range
+            near = bounds.min_range + self.player_radius_m
+            middle = (near + bounds.max_range) / 2
+            amplitude = (bounds.max_range - near) / 2
+            distance = middle + amplitude * math.sin(2 * math.pi * self._player_speed_hz[player] * t
+                                                     + self._player_phase[player])
+            azimuth = math.radians(bounds.azimuth_center)
+            positions[player] = distance * math.sin(azimuth), distance * math.cos(azimuth)
+        return positions
+
+    def _render_players(self, depth_units: np.ndarray, positions: np.ndarray) -> List[tuple]:
+        """Draw all player cylinders into the frame (in place), vectorized over the players.
+
+        The ray hits of every player are computed for all columns at once; players whose
+        columns touch are then drawn together, see _render_column_run. Returns the
+        (rows, cols, mask, units) box of every run for the ground truth.
+        """
+        radius = self.player_radius_m
+        positions = positions[positions[:, 1] - radius > 0]  # Players in front of the camera
+        if not len(positions):
+            return []
+
+        # Nearest intersection of each column's ray (x t, t) with each circle, z = t
+        ray_x = self._ray_x[None, :]
+        center_x, center_z = positions[:, :1], positions[:, 1:]
+        a = ray_x ** 2 + 1
+        b = ray_x * center_x + center_z
+        c = center_x ** 2 + center_z ** 2 - radius ** 2
+        discriminant = b ** 2 - a * c
+        z = np.where(discriminant >= 0, (b - np.sqrt(np.maximum(discriminant, 0))) / a, np.inf)
+
+        # Contiguous runs of hit columns
+        hit = np.concatenate([[False], np.isfinite(z).any(axis=0), [False]])
+        edges = np.flatnonzero(hit[1:] != hit[:-1])
+        players = []
+        for start, stop in zip(edges[::2], edges[1::2]):
+            player = self._render_column_run(depth_units, slice(int(start), int(stop)), z[:, start:stop])
+            if player is not None:
+                players.append(player)
+        return players
+
+    def _render_column_run(self, depth_units: np.ndarray, cols: slice, z: np.ndarray) -> Optional[tuple]:
+        """Draw the players hitting a run of columns, given their (players, columns) hit depths.
+
+        The hits are sorted into depth layers per column, nearest first. A player covers
+        one row interval per column, so a layer costs two integer compares per pixel of
+        the run's box, and layers hidden behind the nearest one are skipped entirely.
+        """
+        layers = np.sort(z, axis=0)
+        layers = layers[:int(np.isfinite(layers).sum(axis=0).max())]  # Most players sharing a column
+
+        # Rows between the top of the player and the floor, y = ray_y * z
+        top = self.camera_height_m - self.player_height_m
+        with np.errstate(divide="ignore"):
+            row_lo = np.searchsorted(self._ray_y, top / layers, side="left")
+            row_hi = np.searchsorted(self._ray_y, self.camera_height_m / layers, side="right")
+        row_hi[~np.isfinite(layers)] = 0  # No hit, empty interval
+        row_lo, row_hi = row_lo.astype(np.int32), row_hi.astype(np.int32)
+        rows = slice(int(row_lo.min()), int(row_hi.max()))
+        if rows.start >= rows.stop:
+            return None
+        row_index = np.arange(rows.start, rows.stop, dtype=np.int32)[:, None]
+
+        # A layer whose rows lie within the nearest layer's in every column is hidden
+        # behind it; for players taller than the camera height that is every other layer
+        visible = [0] + [k for k in range(1, len(layers))
+                         if np.any((row_lo[k] < row_lo[0]) & (row_hi[k] > row_lo[k]))
+                         or np.any(row_hi[k] > row_hi[0])]
+
+        # Farthest layer first, so nearer players overwrite the ones they occlude
+        mask = units = None
+        for k in visible[::-1]:
+            cover = (row_index >= row_lo[k]) & (row_index < row_hi[k])
+            layer_units = self._to_units(np.where(np.isfinite(layers[k]), layers[k], 0.0))
+            if mask is None:
+                mask, units = cover, np.broadcast_to(layer_units, cover.shape)
+            else:
+                mask |= cover
+                units = np.where(cover, layer_units, units)
+
+        box = depth_units[rows, cols]
+        np.copyto(box, np.minimum(box, units), where=mask)
+        return rows, cols, mask, units
+
+    def _ground_truth(self, players: List[tuple]) -> np.ndarray:
+        """Per-sector min of the visible clean depth within range, in meters."""
+        ground_truth_m = np.full(len(self.sectors), np.nan)
+        for sector_id, roi in enumerate(self._rois):
+            if roi is None:
+                continue
+            clean = self._background_units[roi].copy()
+            for rows, cols, mask, units in players:
+                # Overlap of the player's box with the sector crop
+                r0, r1 = max(rows.start, roi[0].start), min(rows.stop, roi[0].stop)
+                c0, c1 = max(cols.start, roi[1].start), min(cols.stop, roi[1].stop)
+                if r0 >= r1 or c0 >= c1:
+                    continue
+                box = (slice(r0 - rows.start, r1 - rows.start), slice(c0 - cols.start, c1 - cols.start))
+                target = clean[r0 - roi[0].start:r1 - roi[0].start, c0 - roi[1].start:c1 - roi[1].start]
+                np.copyto(target, np.minimum(target, units[box]), where=mask[box])
+            low, high = self._unit_ranges[sector_id]
+            in_range = clean[(clean > low) & (clean < high)]
+            if in_range.size:
+                ground_truth_m[sector_id] = float(in_range.min()) * self.depth_scale
+        return ground_truth_m
+
+    def render(self, frame_index: int) -> Tuple[FrameData, np.ndarray]:
+        """Render a frame and its (num_sectors,) ground-truth min distances in meters."""
+        t = frame_index / self.fps
+        depth_units = self._noise_bank[frame_index % NOISE_BANK_SIZE].copy()
+        players = self._render_players(depth_units, self._player_positions(t))
+        frame_data = FrameData(
+            depth_image=depth_units,
+            depth_intrinsics=self.intrinsics,
+            depth_scale=self.depth_scale,
+            timestamp_ms=1000.0 * t
+        )
+        return frame_data, self._ground_truth(players)
+
+    def read(self) -> Optional[FrameData]:
+        if self.realtime:
+            if self._start_wall is None:
+                self._start_wall = time.monotonic()
+            delay = self._start_wall + self._frame_index / self.fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        frame_data, self.last_ground_truth_m = self.render(self._frame_index)
+        self._frame_index += 1
+        return frame_data
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class SampleRing:
+    """Single-producer, single-consumer ring of float32 samples without locks.
+
+    Only the producer thread advances `write_index` and only the audio callback advances
+    `read_index`. Both only ever grow and are published after the samples are copied, so
+    each side sees a consistent fill level without taking a lock (a blocked lock in the
+    audio callback would be an underrun).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.float32)
+        self.write_index = 0  # Total samples written, owned by the producer
+        self.read_index = 0   # Total samples read, owned by the consumer
+
+    def available(self) -> int:
+        """Samples that can be read."""
+        return self.write_index - self.read_index
+
+    def space(self) -> int:
+        """Samples that can be written."""
+        return self.capacity - (self.write_index - self.read_index)
+
+    def write(self, samples: np.ndarray) -> int:
+        """Copy as many samples as fit into the ring; returns how many were written."""
+        count = min(len(samples), self.space())
+        start = self.write_index % self.capacity
+        first = min(count, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:count - first] = samples[first:count]
+        self.write_index += count
+        return count
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Copy up to len(out) samples into out; returns how many were read."""
+        count = min(len(out), self.available())
+        start = self.read_index % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        out[first:count] = self.buffer[:count - first]
+        self.read_index += count
+        return count
@@ -1,6 +1,8 @@
 import yaml
 from dataclasses import dataclass
 
+from src.piano.scales import A4_HZ
+
 @dataclass
 class RayConfig:
     azimuth_center: float
@@ -14,6 +16,9 @@ class NoteMapperConfig:
     max_range: float = 3.5
     lowest_note: str = 'C3'
     highest_note: str = 'C4'
+    key: str = 'C'  # Tonic of the scale the notes are taken from
+    mode: str = 'major'  # See src/piano/scales.py MODES
+    a4: float = A4_HZ  # Tuning reference in Hz
 
 @dataclass
 class SectorConfig:
@@ -21,32 +26,48 @@ class SectorConfig:
     color: tuple[int, int, int]
     ray: RayConfig
     note_mapper: NoteMapperConfig
+    timbre: str = 'sine'  # Wavetable of the sector's voice, see src/piano/wavetables.py
+
+CONFIG_PATH = "src/piano/config.yaml"  # Default sector configuration, relative to the repo root
+
+def _get_section(sec: dict, key: str, legacy_key: str) -> dict:
+    """A sector's sub-section, also accepting the key used by older config files."""
+    section = sec.get(key, sec.get(legacy_key))
+    if section is None:
+        raise ValueError(f"Sector '{sec.get('name')}' has no '{key}' section.")
+    return section
 
-def load_config(config_path: str) -> dict[str, SectorConfig]:
+def load_config(config_path: str = CONFIG_PATH) -> dict[str, SectorConfig]:
     """
     Load sector configurations from the YAML file.
-    Returns a dictionary keyed by sector name.
+    Returns a dictionary keyed by sector name, in the order of the file.
+    Sections may use the older 'angular' and 'mapper' keys instead of 'ray' and 'note_mapper'.
     """
     with open(config_path, 'r') as file:
         config = yaml.safe_load(file)
     
-    sectors_list = config.get('sectors')
+    sectors_list = (config or {}).get('sectors')
     if not sectors_list:
         raise ValueError("No sectors found in configuration.")
     
     sector_configs = {}
     for sec in sectors_list:
+        ray = _get_section(sec, 'ray', 'angular')
+        mapper = _get_section(sec, 'note_mapper', 'mapper')
         ray_conf = RayConfig(
-            azimuth_center=sec['ray']['azimuth_center'],
-            azimuth_span=sec['ray']['azimuth_span'],
-            elevation_center=sec['ray'].get('elevation_center', 0),
-            elevation_span=sec['ray'].get('elevation_span', 0)
+            azimuth_center=ray['azimuth_center'],
+            azimuth_span=ray['azimuth_span'],
+            elevation_center=ray.get('elevation_center', 0),
+            elevation_span=ray.get('elevation_span', 0)
         )
         note_mapper_conf = NoteMapperConfig(
-            min_range=sec['note_mapper'].get('min_range', 0.5),
-            max_range=sec['note_mapper'].get('max_range', 3.5),
-            lowest_note=sec['note_mapper'].get('lowest_note', 'C3'),
-            highest_note=sec['note_mapper'].get('highest_note', 'C4')
+            min_range=mapper.get('min_range', 0.5),
+            max_range=mapper.get('max_range', 3.5),
+            lowest_note=mapper.get('lowest_note', 'C3'),
+            highest_note=mapper.get('highest_note', 'C4'),
+            key=mapper.get('key', 'C'),
+            mode=mapper.get('mode', 'major'),
+            a4=float(mapper.get('a4', A4_HZ))
         )
         # Get color from YAML (expects a list of 3 ints) and convert to tuple.
         color = tuple(sec.get('color', [255, 255, 255]))
@@ -54,6 +75,7 @@ def load_config(config_path: str) -> dict[str, SectorConfig]:
             name=sec['name'],
             color=color,
             ray=ray_conf,
-            note_mapper=note_mapper_conf
+            note_mapper=note_mapper_conf,
+            timbre=sec.get('timbre', 'sine')
         )
-    return sector_configs
\ No newline at end of file
+    return sector_configs
@@ -0,0 +1,79 @@
+"""
+Hot reload of the sector configuration.
+
+A background thread polls the config file's modification time. Once a change has
+settled (the file is unchanged for one more poll, so a half-written save is not
+read), it loads the file and builds a complete new Instrument next to the live one,
+reusing the unchanged sectors and compiling the detector for the current stream. The
+new instrument is published with a single assignment; the piano loop reads
+`watcher.instrument` once per frame, so every frame sees one consistent instrument and
+the camera stream and audio keep running. A file that fails to load keeps the current
+instrument.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+import yaml
+
+from src.piano.config_loader import load_config
+from src.piano.instrument import Instrument
+
+POLL_S = 0.25  # Seconds between checks of the config file
+
+
+class ConfigWatcher:
+    """Rebuilds the instrument in a background thread whenever the config file changes."""
+
+    def __init__(self, config_path: str, instrument: Instrument, poll_s: float = POLL_S):
+        self.config_path = config_path
+        self.instrument = instrument  # Replaced (never modified) on every successful reload
+        self.poll_s = poll_s
+        self.reloads = 0
+        self._signature = self._stat()
+        self._pending = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None  # Editors may briefly remove the file while saving
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            signature = self._stat()
+            if signature != self._signature:
+                # Wait one more poll for the editor to finish writing
+                self._signature = signature
+                self._pending = True
+            elif self._pending and signature is not None:
+                self._pending = False
+                self.reload()
+
+    def reload(self) -> bool:
+        """Load the config and swap in the new instrument; False if the config is invalid."""
+        start = time.perf_counter()
+        try:
+            instrument = Instrument.build(load_config(self.config_path), previous=self.instrument)
+        except (OSError, KeyError, TypeError, ValueError, yaml.YAMLError) as e:
+            print(f"Keeping the current sectors, could not reload {self.config_path}: {e}")
+            return False
+        changed = instrument.changed_sectors(self.instrument)
+        self.instrument = instrument
+        self.reloads += 1
+        print(f"Reloaded {self.config_path} in {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"changed sectors: {', '.join(changed) or 'none'}")
+        return True
@@ -0,0 +1,94 @@
+"""
+The instrument: everything the piano loop derives from the sector configuration.
+
+An Instrument is built as a whole and not modified afterwards (apart from its detector
+compiling itself for the stream), so a config reload can build a new one next to the
+live one and swap it in with a single assignment, see src/piano/config_watcher.py.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.detectors.angular_detector import Sector, AngularBounds
+from src.detectors.sector_engine import MultiSectorDetector
+from src.piano.config_loader import SectorConfig
+from src.piano.voices import NoteTables, SectorDistanceToNoteMapper
+from src.piano.wavetables import TIMBRE_HARMONICS
+
+
+class SectorWithMapper:
+    """Encapsulates a Sector and its corresponding SectorDistanceToNoteMapper."""
+    def __init__(self, name: str, config: SectorConfig):
+        self.name = name
+        self.sector = self._create_sector(config)
+        self.mapper = self._create_mapper(config)
+        self.timbre = config.timbre
+        if self.timbre not in TIMBRE_HARMONICS:
+            raise ValueError(f"Sector '{name}' has unknown timbre '{self.timbre}'")
+
+    def _create_sector(self, config: SectorConfig) -> Sector:
+        bounds = AngularBounds(
+            azimuth_center=config.ray.azimuth_center,
+            azimuth_span=config.ray.azimuth_span,
+            elevation_center=getattr(config.ray, "elevation_center", 0),
+            elevation_span=getattr(config.ray, "elevation_span", 0),
+            min_range=getattr(config.ray, "min_range", 0.5),
+            max_range=getattr(config.ray, "max_range", 2.6)
+        )
+        return Sector(self.name, config.color, bounds)
+
+    def _create_mapper(self, config: SectorConfig) -> SectorDistanceToNoteMapper:
+        return SectorDistanceToNoteMapper(config.note_mapper)
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """Sectors with their note mappers, the compiled detector and the note tables."""
+    configs: Dict[str, SectorConfig]
+    sectors_with_mappers: List[SectorWithMapper]
+    detector: MultiSectorDetector
+    note_tables: NoteTables      # All mappers, for one lookup per frame
+    sector_index: Dict[str, int]  # Voice index of every sector
+
+    @classmethod
+    def build(cls, configs: Dict[str, SectorConfig], previous: Optional["Instrument"] = None,
+              stride: int = 1, cache=None) -> "Instrument":
+        """Build an instrument for the configs.
+
+        With a previous instrument, unchanged sectors keep their mappers, the detector
+        takes over its stride and cache, and it is compiled right away for the stream the
+        previous one ran on, so the first frame after a swap does not pay for it.
+        """
+        reusable: Dict[str, SectorWithMapper] = {}
+        if previous is not None:
+            stride, cache = previous.detector.stride, previous.detector.cache
+            reusable = {
+                swm.name: swm for swm in previous.sectors_with_mappers
+                if previous.configs.get(swm.name) == configs.get(swm.name)
+            }
+        sectors_with_mappers = [
+            reusable.get(name) or SectorWithMapper(name, config) for name, config in configs.items()
+        ]
+
+        # Compiled detector shared by all sectors (compiled on the first frame)
+        detector = MultiSectorDetector([swm.sector for swm in sectors_with_mappers], stride, cache)
+        if previous is not None and previous.detector.stream is not None:
+            detector.compile(*previous.detector.stream)
+
+        return cls(
+            configs=dict(configs),
+            sectors_with_mappers=sectors_with_mappers,
+            detector=detector,
+            note_tables=NoteTables([swm.mapper for swm in sectors_with_mappers]),
+            sector_index={swm.name: index for index, swm in enumerate(sectors_with_mappers)},
+        )
+
+    def changed_sectors(self, previous: "Instrument") -> List[str]:
+        """Names of the sectors that are new or configured differently than in previous."""
+        return [name for name, config in self.configs.items() if previous.configs.get(name) != config]
+
+    def unchanged_sectors(self, previous: "Instrument") -> Dict[int, int]:
+        """Voice index in previous of every sector (by voice index here) configured the same in both."""
+        return {
+            index: previous.sector_index[name] for name, index in self.sector_index.items()
+            if name in previous.sector_index and previous.configs.get(name) == self.configs[name]
+        }
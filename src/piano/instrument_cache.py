@@ -0,0 +1,142 @@
+"""
+Optional on-disk cache of compiled instruments (main.py --instrument-cache DIR).
+
+Compiling the MultiSectorDetector for a depth stream (1D angle maps, sector crop
+rectangles and depth-unit limits) depends only on the sector configuration, the stream
+intrinsics and the depth scale; the pixel stride is applied afterwards. The result is
+validated and stored as an uncompressed .npz named after a hash of all of those, so a
+restart with the same camera and config loads it instead of compiling again. A changed
+config or camera mode simply hashes to a new file. Only the most recently used files are
+kept, so editing the config over many sessions does not grow the directory without bound.
+
+For the configs shipped here compiling takes well under a millisecond, about as long as
+reading the file, so the cache is off by default. It pays off for many sectors or
+high-resolution streams.
+"""
+import hashlib
+import json
+import os
+import zipfile
+from dataclasses import asdict
+from typing import Dict, Optional
+import numpy as np
+
+from src.detectors.angular_detector import MAX_DEPTH_UNITS, intrinsics_key
+
+CACHE_VERSION = 3  # Bump whenever the compiled arrays change meaning
+MAX_CACHED_INSTRUMENTS = 16  # Instrument files kept, least recently used ones are deleted
+
+# Arrays of a compiled instrument, see MultiSectorDetector.compile_arrays
+INSTRUMENT_ARRAYS = ("azimuth_cols", "elevation_rows", "roi_bounds", "depth_limits")
+
+
+def instrument_key(sectors, intrinsics, depth_scale: float) -> str:
+    """Hash of everything the compiled arrays depend on."""
+    description = {
+        "version": CACHE_VERSION,
+        "sectors": [[sector.name, asdict(sector.bounds)] for sector in sectors],
+        "intrinsics": intrinsics_key(intrinsics),
+        "depth_scale": float(depth_scale),
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def validate_instrument(arrays: Dict[str, np.ndarray], num_sectors: int, width: int, height: int) -> None:
+    """Raise ValueError unless the arrays form a consistent instrument for this stream."""
+    missing = [name for name in INSTRUMENT_ARRAYS if name not in arrays]
+    if missing:
+        raise ValueError(f"Instrument is missing {', '.join(missing)}")
+    if arrays["azimuth_cols"].shape != (width,) or arrays["elevation_rows"].shape != (height,):
+        raise ValueError("Angle maps do not match the frame size")
+    if np.any(np.diff(arrays["azimuth_cols"]) <= 0) or np.any(np.diff(arrays["elevation_rows"]) <= 0):
+        raise ValueError("Angle maps are not increasing")
+    roi_bounds, depth_limits = arrays["roi_bounds"], arrays["depth_limits"]
+    if roi_bounds.shape != (num_sectors, 4) or depth_limits.shape != (num_sectors, 2):
+        raise ValueError(f"Instrument does not have {num_sectors} sectors")
+    on_frame = roi_bounds[:, 0] >= 0
+    row_start, row_stop, col_start, col_stop = roi_bounds[on_frame].T
+    if not (np.all(row_start < row_stop) and np.all(row_stop <= height)
+            and np.all(col_start >= 0) and np.all(col_start < col_stop) and np.all(col_stop <= width)):
+        raise ValueError("Sector crops fall outside the frame")
+    if not np.all((depth_limits >= 0) & (depth_limits <= MAX_DEPTH_UNITS)):
+        raise ValueError("Depth limits fall outside the raw depth range")
+
+
+class InstrumentCache:
+    """Compile hook for MultiSectorDetector that keeps the compiled arrays on disk."""
+
+    def __init__(self, directory: str, max_files: int = MAX_CACHED_INSTRUMENTS):
+        self.directory = directory
+        self.max_files = max(max_files, 1)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"instrument_{key}.npz")
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """The cached arrays, or None if there are none (or they cannot be read)."""
+        try:
+            with np.load(self.path(key), allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Ignoring unreadable instrument cache {self.path(key)}: {e}")
+            return None
+        try:
+            os.utime(self.path(key))  # The modification time doubles as the last use for evict()
+        except OSError:
+            pass  # A read-only cache still serves its files
+        return arrays
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray]) -> None:
+        """Write the arrays atomically, so a crash never leaves a half-written file behind."""
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(temp_path, path)
+            self.evict()
+        except OSError as e:
+            # A read-only or full disk only costs the next start its cache hit
+            print(f"Could not write instrument cache {path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self) -> None:
+        """Delete all but the max_files most recently used instrument files."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("instrument_") and name.endswith(".npz"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.stat(path).st_mtime_ns, path))
+                except FileNotFoundError:
+                    pass  # Evicted by another process in the meantime
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_files:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def load_or_compile(self, detector, intrinsics, depth_scale: float) -> Dict[str, np.ndarray]:
+        """The detector's compiled arrays for this stream, from the cache when possible."""
+        num_sectors = len(detector.sectors)
+        key = instrument_key(detector.sectors, intrinsics, depth_scale)
+        arrays = self.load(key)
+        if arrays is not None:
+            try:
+                validate_instrument(arrays, num_sectors, intrinsics.width, intrinsics.height)
+                return arrays
+            except ValueError as e:
+                print(f"Recompiling invalid instrument {key}: {e}")
+
+        arrays = detector.compile_arrays(intrinsics, depth_scale)
+        validate_instrument(arrays, num_sectors, intrinsics.width, intrinsics.height)
+        for sector, (row_start, _, _, _) in zip(detector.sectors, arrays["roi_bounds"]):
+            if row_start < 0:
+                print(f"Warning: sector {sector.name} lies outside the camera's field of view")
+        self.save(key, arrays)
+        return arrays
@@ -0,0 +1,151 @@
+import json
+import time
+from typing import Dict, Optional, TextIO
+import numpy as np
+
+WINDOW_FRAMES = 600  # Samples kept per stage, about 20 s at 30 FPS
+PERCENTILES = (50, 90, 99)
+
+
+class _RollingSamples:
+    """Fixed-size ring of the most recent samples of one stage, in milliseconds."""
+
+    def __init__(self, size: int):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+
+    def add(self, value_ms: float) -> None:
+        self.values[self.count % len(self.values)] = value_ms
+        self.count += 1
+
+    def summary(self) -> Optional[Dict[str, float]]:
+        filled = self.values[:min(self.count, len(self.values))]
+        if filled.size == 0:
+            return None
+        result = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(filled, PERCENTILES))}
+        result["max"] = float(filled.max())
+        return result
+
+
+class StageTimer:
+    """Low-overhead per-stage timing of the piano loop with periodic summaries.
+
+    Each stage is timed with monotonic perf_counter laps and kept in a rolling window,
+    percentiles are only computed when a summary is due. Typical use:
+
+        t = timer.now()
+        frame_data = read_frame()
+        t = timer.lap("capture", t)
+        ...
+        timer.end_frame(frame_start, frame_data)
+
+    Running totals such as dropped frames are set with count() and shown in every summary.
+    Summaries are printed every `report_interval_s` seconds (0 = only on report()) and
+    appended as JSON lines to `jsonl_path` if given. With `measure_age` the age of each
+    frame (host clock minus camera timestamp) is tracked as well, which needs the camera
+    timestamps to be in the host time domain, as they are for live RealSense streams.
+    """
+
+    def __init__(self, report_interval_s: float = 10.0, jsonl_path: Optional[str] = None,
+                 measure_age: bool = True, window: int = WINDOW_FRAMES):
+        self.report_interval_s = report_interval_s
+        self.measure_age = measure_age
+        self.window = window
+        self._stages: Dict[str, _RollingSamples] = {}
+        self.counters: Dict[str, int] = {}  # Running totals, see count()
+        self._jsonl: Optional[TextIO] = open(jsonl_path, "a") if jsonl_path else None
+        self._frames = 0
+        self._report_frames = 0
+        self._report_time = time.perf_counter()
+
+    now = staticmethod(time.perf_counter)
+
+    def add(self, stage: str, value_ms: float) -> None:
+        """Record a sample (in milliseconds) for a stage."""
+        samples = self._stages.get(stage)
+        if samples is None:
+            samples = self._stages[stage] = _RollingSamples(self.window)
+        samples.add(value_ms)
+
+    def count(self, name: str, total: int) -> None:
+        """Set a running total (e.g. dropped frames) that is reported with every summary."""
+        self.counters[name] = total
+
+    def lap(self, stage: str, start: float) -> float:
+        """Record the time since `start` for a stage and return the current time."""
+        end = time.perf_counter()
+        self.add(stage, (end - start) * 1000.0)
+        return end
+
+    def end_frame(self, frame_start: float, frame_data=None) -> None:
+        """Record the total frame time, the capture sub-stages and frame age; report if due."""
+        end = self.lap("frame", frame_start)
+        if frame_data is not None:
+            for stage, value_ms in frame_data.stage_ms.items():
+                self.add(stage, value_ms)
+            if self.measure_age and frame_data.timestamp_ms:
+                self.add("age", time.time() * 1000.0 - frame_data.timestamp_ms)
+        self._frames += 1
+        if self.report_interval_s and end - self._report_time >= self.report_interval_s:
+            self.report()
+
+    def summary(self) -> dict:
+        """FPS since the last report and percentiles of every stage over the rolling window."""
+        elapsed = time.perf_counter() - self._report_time
+        return {
+            "time": time.time(),
+            "frames": self._frames,
+            "fps": (self._frames - self._report_frames) / elapsed if elapsed > 0 else 0.0,
+            "stages_ms": {stage: samples.summary() for stage, samples in self._stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def report(self) -> dict:
+        """Print (and log) the current summary and start a new FPS interval."""
+        summary = self.summary()
+        totals = "".join(f", {total} {name}" for name, total in summary["counters"].items())
+        print(f"{summary['fps']:.1f} FPS over {summary['frames']} frames{totals} (ms p50/p90/p99/max)")
+        for stage, stats in summary["stages_ms"].items():
+            if stats is not None:
+                print(f"  {stage:<10} {stats['p50']:7.2f} {stats['p90']:7.2f} "
+                      f"{stats['p99']:7.2f} {stats['max']:7.2f}")
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(summary) + "\n")
+            self._jsonl.flush()
+        self._report_frames = self._frames
+        self._report_time = time.perf_counter()
+        return summary
+
+    def close(self) -> None:
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+
+
+class StartupProfile:
+    """Wall time of each startup step, from the first line of the entry point to the first frame.
+
+    Steps are laps like StageTimer's, named after the work done since the previous step
+    ("imports", "config", "camera", ...), and reported once as a single line. For a
+    per-module breakdown of the imports run Python with -X importtime.
+    """
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.steps: Dict[str, float] = {}  # Step name -> milliseconds
+        self.reported = False
+
+    def step(self, name: str) -> None:
+        now = time.perf_counter()
+        self.steps[name] = self.steps.get(name, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def report(self) -> None:
+        """Print the breakdown, only the first time it is called."""
+        if self.reported:
+            return
+        self.reported = True
+        total_ms = (self._last - self.start) * 1000.0
+        steps = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.steps.items())
+        print(f"Startup: {steps} (total {total_ms:.0f} ms)")
@@ -1,183 +1,328 @@
+# Must stay the first statements of the module: the startup profile's "imports" step is
+# measured from here, so it includes numpy and every module imported below. Taking the
+# time after those imports (or in the __main__ block) would leave their cost unreported.
 import time
-import pyrealsense2 as rs
+MODULE_START = time.perf_counter()
+
 import numpy as np
-import cv2
 import argparse
 import os
-import math
-from typing import Dict, List, Tuple
+from typing import List, Tuple
 
+# Camera, audio and display libraries are imported where they are first needed, so
+# --help, --check-config and tools that import this module start without them
 from src.piano.tone_generator import ToneGenerator
-from src.detectors.angular_detector import Sector, AngularBounds, SectorDetection
-from src.io.frames import get_color_and_depth_frames, FrameData
-from src.piano.config_loader import load_config  # Loads sector configurations
-from src.piano.voices import SectorDistanceToNoteMapper
-
-# Load sector configurations from YAML
-sector_configs: Dict[str, any] = load_config("src/piano/config.yaml")
-
-# Build dynamic list of SectorWithMapper objects from YAML
-class SectorWithMapper:
-    """Encapsulates a Sector and its corresponding SectorDistanceToNoteMapper."""
-    def __init__(self, name: str, config: dict):
-        self.name = name
-        self.sector = self._create_sector(config)
-        self.mapper = self._create_mapper(config)
-
-    def _create_sector(self, config: dict) -> Sector:
-        bounds = AngularBounds(
-            azimuth_center=config.ray.azimuth_center,
-            azimuth_span=config.ray.azimuth_span,
-            elevation_center=getattr(config.ray, "elevation_center", 0),
-            elevation_span=getattr(config.ray, "elevation_span", 0),
-            min_range=getattr(config.ray, "min_range", 0.5),
-            max_range=getattr(config.ray, "max_range", 2.6)
-        )
-        return Sector(self.name, config.color, bounds)
-
-    def _create_mapper(self, config: dict) -> SectorDistanceToNoteMapper:
-        return SectorDistanceToNoteMapper(config.note_mapper)
-
-SECTORS_WITH_MAPPERS: List[SectorWithMapper] = [
-    SectorWithMapper(name, s_conf) for name, s_conf in sector_configs.items()
-]
+from src.detectors.angular_detector import SectorDetection
+from src.detectors.sector_engine import MultiSectorDetector
+from src.piano.instrumentation import StageTimer, StartupProfile
+from src.piano.quality import AdaptiveQualityController
+from src.piano.instrument_cache import InstrumentCache
+from src.io.frames import FrameData
+from src.io.frame_source import FrameRecorder, FrameSource, RealSenseFrameSource, RecordingFrameSource
+from src.io.synthetic import SyntheticDepthScene
+from src.io.capture import CaptureThread, FrameRing
+from src.piano.config_loader import CONFIG_PATH, load_config  # Loads sector configurations
+from src.piano.instrument import Instrument, SectorWithMapper
+from src.piano.config_watcher import ConfigWatcher
+from src.piano.note_filter import HYSTERESIS_M, SMOOTHING_METHODS, NoteFilter
+
+def load_instrument(config_path: str = CONFIG_PATH) -> Instrument:
+    """Sectors, note mappers and the detector built from the YAML config."""
+    return Instrument.build(load_config(config_path))
+
+def check_config(config_path: str = CONFIG_PATH) -> None:
+    """Build the instrument from the config (raising on any error) and list its sectors."""
+    instrument = load_instrument(config_path)
+    for index, swm in enumerate(instrument.sectors_with_mappers):
+        mapper = swm.mapper
+        print(f"Voice {index}: {swm.name}, {mapper.notes[0] if mapper.notes else '-'} to "
+              f"{mapper.notes[-1] if mapper.notes else '-'} ({len(mapper.notes)} notes) over "
+              f"{mapper.min_range:.2f}-{mapper.max_range:.2f} m, timbre {swm.timbre}")
+    print(f"{config_path}: {len(instrument.sectors_with_mappers)} sectors OK")
 
 NUM_POINTS = 50 * 50  # Minimum number of valid points for a valid detection
 
-def get_discrete_color(index: int, total: int) -> tuple[int, int, int]:
+def get_min_points(decimation: int = 1) -> int:
+    """NUM_POINTS scaled to a depth image decimated (or detected with a pixel stride) by the
+    given factor in each direction."""
+    return NUM_POINTS // max(decimation, 1) ** 2
+
+def detect_sectors(frame_data: FrameData,
+                   sectors_with_mappers: List[SectorWithMapper],
+                   detector: MultiSectorDetector,
+                   min_points: int = NUM_POINTS
+                  ) -> List[Tuple[SectorDetection, SectorWithMapper]]:
     """
-    Generate a discrete color from a continuous HSV colormap.
-    The hue is spread evenly over the range [0, 180] (OpenCV HSV hue range).
+    Detect all sectors without drawing anything or modifying the frame.
+    Only detections with more than min_points valid points are returned.
     """
-    hue = int((index / total) * 180)
-    hsv = np.uint8([[[hue, 255, 255]]])
-    bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0][0]
-    return tuple(int(c) for c in bgr)
+    # All sectors are detected in one pass over the depth image
+    all_detections = detector.detect(frame_data)
+    return [
+        (detection, swm)
+        for swm, detection in zip(sectors_with_mappers, all_detections)
+        if detection is not None and detection.num_valid_points > min_points
+    ]
 
 
-def overlay_sectors(frame_data: FrameData,
-                    sectors_with_mappers: List[SectorWithMapper]
-                   ) -> Tuple[np.ndarray, List[Tuple[SectorDetection, SectorWithMapper]]]:
-    """
-    Overlay sector detections on the color image using text that reflects the ray configuration.
-    The text color for each sector is chosen based on the discrete color corresponding to the note range.
-    """
-    overlay_image = frame_data.color_image_rgb.copy()
-    blended = overlay_image.copy()
-    
-    # Convert depth image (in millimeters) to meters.
-    depths = frame_data.depth_image.astype(float) / 1000.0
-    
-    # Calculate the horizontal FOV of the camera from intrinsics.
-    width = frame_data.depth_intrinsics.width
-    fx = frame_data.depth_intrinsics.fx
-    h_fov = 2 * np.rad2deg(np.arctan(width / (2 * fx)))
-    
-    detections: List[Tuple[SectorDetection, SectorWithMapper]] = []
-    
-    for swm in sectors_with_mappers:
-        detection = swm.sector.detect(frame_data)
-        if detection is None or detection.num_valid_points <= NUM_POINTS:
-            continue
-        
-        # Determine which note interval the detection.min_distance_m falls into.
-        total_ranges = len(swm.mapper.ranges)
-        note_index = total_ranges - 1  # Default to last range.
-        for idx, (d_min, d_max, _) in enumerate(swm.mapper.ranges):
-            if d_min <= detection.min_distance_m < d_max:
-                note_index = idx
-                break
-        
-        discrete_color = get_discrete_color(note_index, total_ranges)
-        
-        # Use the note mapper to get note label (optional)
-        note_label = swm.mapper.get_note_from_distance(detection.min_distance_m)
-        
-        # Compute text x position using the sector's azimuth_center.
-        img_width = overlay_image.shape[1]
-        x_pos = int(((swm.sector.bounds.azimuth_center + h_fov/2) / h_fov) * img_width)
-        
-        cv2.putText(blended, f"{swm.sector.name}", (x_pos, 25),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, discrete_color, 2)
-        cv2.putText(blended, f"Dist: {detection.min_distance_m:.1f}m", (x_pos, 50),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, discrete_color, 2)
-        cv2.putText(blended, f"Note: {note_label}", (x_pos, 75),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, discrete_color, 2)
-        cv2.putText(blended, f"Points: {detection.num_valid_points}", (x_pos, 100),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, discrete_color, 2)
-        
-        # Apply discrete color overlay for each note range.
-        color_overlay = np.zeros_like(overlay_image)
-        color_overlay[detection.valid_mask] = discrete_color
-        blended = cv2.addWeighted(blended, 1.0, color_overlay, 0.4, 0)
-        
-        detections.append((detection, swm))
-    
-    return blended, detections
-
-def main(bag_file=None):
+def unsupported_multiprocess_options(threaded_capture=False, record_dir=None, frame_budget_ms=None,
+                                     watch_config=False) -> List[str]:
+    """Flags the multi-process pipeline does not implement, which must not be combined with it."""
+    options = (("--threaded-capture", threaded_capture), ("--record", record_dir),
+               ("--frame-budget-ms", frame_budget_ms), ("--watch-config", watch_config))
+    return [flag for flag, value in options if value]
+
+def swap_instrument(instrument: Instrument, tone_gen: ToneGenerator, stride: int) -> Instrument:
+    """Adopt a reloaded instrument: keep the current detection stride and retune the voices' timbres."""
+    instrument.detector.stride = stride
+    for index, swm in enumerate(instrument.sectors_with_mappers[:tone_gen.num_voices]):
+        tone_gen.bank.set_timbre(index, swm.timbre)
+    extra = len(instrument.sectors_with_mappers) - tone_gen.num_voices
+    if extra > 0:
+        print(f"{extra} new sector(s) have no audio voice and stay silent until restart")
+    return instrument
+
+def main(bag_file=None, headless=False, threaded_capture=False, ring_size=2,
+         align_depth=True, decimation=1, multiprocess=False,
+         replay_dir=None, realtime_replay=True, record_dir=None, synthetic=False,
+         stats_interval=10.0, stats_file=None, frame_budget_ms=None,
+         low_latency_audio=False, audio_buffer=None, instrument_cache=None,
+         watch_config=False, config_path=CONFIG_PATH, startup=None,
+         smoothing="ema", note_hysteresis_m=HYSTERESIS_M):
+    # Each startup step is timed and the breakdown printed after the first frame
+    startup = startup or StartupProfile()
+    if multiprocess:
+        unsupported = unsupported_multiprocess_options(threaded_capture, record_dir, frame_budget_ms, watch_config)
+        if unsupported:
+            raise ValueError(f"--multiprocess cannot be combined with {', '.join(unsupported)}")
     try:
         if bag_file and not os.path.exists(bag_file):
             raise FileNotFoundError(f"The specified .bag file does not exist: {bag_file}")
 
-        pipeline = rs.pipeline()
-        config = rs.config()
-        if bag_file:
-            rs.config.enable_device_from_file(config, bag_file)
-        
-        config.enable_stream(rs.stream.depth)
-        config.enable_stream(rs.stream.color)
-        pipeline_profile = pipeline.start(config)
-        
-        depth_stream = pipeline_profile.get_stream(rs.stream.depth).as_video_stream_profile()
-        color_stream = pipeline_profile.get_stream(rs.stream.color).as_video_stream_profile()
+        # Headless runs never look at color, so detect in native depth space without it
+        align_depth = align_depth and not headless
+        stream_decimation = decimation if not align_depth else 1
+        min_points = get_min_points(stream_decimation)
 
-        depth_intrinsics = depth_stream.get_intrinsics()
-        color_intrinsics = color_stream.get_intrinsics()
+        # With a cache directory, compiled detector arrays are reused across restarts
+        instrument = load_instrument(config_path)
+        instrument.detector.cache = InstrumentCache(instrument_cache) if instrument_cache else None
+        startup.step("config")
 
-        print(f"Depth: {depth_intrinsics.width}x{depth_intrinsics.height} @ {depth_stream.fps()} FPS")
-        print(f"Color: {color_intrinsics.width}x{color_intrinsics.height} @ {color_stream.fps()} FPS")
+        source: FrameSource
+        if synthetic:
+            # Generated players walking along the configured rays, no camera needed
+            source = SyntheticDepthScene([swm.sector for swm in instrument.sectors_with_mappers],
+                                         realtime=realtime_replay)
+        elif replay_dir:
+            # Recordings hold whatever geometry they were captured in, no camera needed
+            source = RecordingFrameSource(replay_dir, realtime=realtime_replay)
+        else:
+            source = RealSenseFrameSource(bag_file, enable_color=not headless,
+                                          align_depth=align_depth, decimation=decimation)
 
-        align_to = rs.stream.color
-        align = rs.align(align_to)
+        if multiprocess:
+            from src.piano.multiprocess_pipeline import run_multiprocess_pipeline
+            startup.step("imports")
+            startup.report()  # The worker processes start on their own
+            run_multiprocess_pipeline(instrument.sectors_with_mappers, min_points, source, headless=headless,
+                                      low_latency_audio=low_latency_audio, audio_buffer=audio_buffer,
+                                      instrument_cache=instrument_cache, smoothing=smoothing,
+                                      note_hysteresis_m=note_hysteresis_m, stats_interval=stats_interval,
+                                      stats_file=stats_file)
+            return
 
-        tone_gen = ToneGenerator()
+        source.start()
+        read_frame = source.read
+        recorder = FrameRecorder(record_dir, record_color=not headless) if record_dir else None
+        startup.step("frame source")
+
+        tone_gen = ToneGenerator(num_voices=len(instrument.sectors_with_mappers),
+                                 timbres=[swm.timbre for swm in instrument.sectors_with_mappers],
+                                 low_latency=low_latency_audio, buffer_size=audio_buffer)
         tone_gen.start()
+        startup.step("audio")
+
+        renderer = None
+        if not headless:
+            import cv2
+            from src.piano.renderer import SectorOverlayRenderer
+            renderer = SectorOverlayRenderer()
+            startup.step("display")
+
+        # Smoothed, debounced notes; the tone generator is only updated when a note changes
+        note_filter = NoteFilter(instrument.note_tables, smoothing, hysteresis_m=note_hysteresis_m)
+
+        # Edits to the config are compiled in the background and swapped in between frames
+        watcher = ConfigWatcher(config_path, instrument) if watch_config else None
+        if watcher is not None:
+            watcher.start()
 
-        frame_count = 0
-        start_time = time.time()
+        if threaded_capture:
+            # Capture runs on its own thread and only the newest frame is processed
+            ring = FrameRing(ring_size)
+            capture = CaptureThread(read_frame, ring)
+            capture.start()
+
+        # Frame age needs camera timestamps in host time, which replays and synthetic frames lack
+        timer = StageTimer(stats_interval, stats_file, measure_age=not (synthetic or replay_dir or bag_file))
+
+        # Trades detection resolution and overlay work for frame time when over budget
+        quality = AdaptiveQualityController(frame_budget_ms) if frame_budget_ms else None
+        level = quality.level if quality is not None else None
+        frame_index = 0
 
         while True:
-            frame_data = get_color_and_depth_frames(pipeline, align)
+            frame_start = t = timer.now()
+            if threaded_capture:
+                frame_data = ring.get_latest(timeout=1.0)
+                if capture.error is not None:
+                    raise capture.error
+                timer.count("dropped", ring.dropped)
+            else:
+                frame_data = read_frame()
             if frame_data is None:
                 continue
+            t = processing_start = timer.lap("capture", t)
+            if recorder is not None:
+                recorder.write(frame_data)
+                t = timer.lap("record", t)
             
-            overlay_image, detections = overlay_sectors(frame_data, SECTORS_WITH_MAPPERS)
+            if watcher is not None and watcher.instrument is not instrument:
+                previous = instrument
+                instrument = swap_instrument(watcher.instrument, tone_gen, level.stride if level is not None else 1)
+                reloaded_filter = NoteFilter(instrument.note_tables, smoothing, hysteresis_m=note_hysteresis_m)
+                # Unchanged sectors keep sounding, the others are released so none is held forever
+                reloaded_filter.carry_over(note_filter, instrument.unchanged_sectors(previous))
+                note_filter = reloaded_filter
+                tone_gen.set_frequencies(note_filter.frequencies)
+            detections = detect_sectors(frame_data, instrument.sectors_with_mappers, instrument.detector, min_points)
+            t = timer.lap("detect", t)
             
-            # For each detection, use the corresponding mapper to get the frequency,
-            # then update the tone generator with the obtained frequencies
-            frequencies = [
-                swm.mapper.get_frequency_from_distance(detection.min_distance_m)
-                for detection, swm in detections
-            ]
-            tone_gen.set_frequencies(frequencies)
+            # Filter every sector's distance into a note, then update the tone generator if
+            # any note changed. Every sector has its own voice (and timbre), sectors without
+            # a detection (NaN) fall silent once the filter releases them.
+            distances = np.full(len(instrument.sectors_with_mappers), np.nan)
+            for detection, swm in detections:
+                distances[instrument.sector_index[swm.name]] = detection.min_distance_m
+            if len(note_filter.update(distances)):
+                tone_gen.set_frequencies(note_filter.frequencies)
+            t = timer.lap("audio", t)
             
-            cv2.imshow('Depth Camera Piano', overlay_image)
-            if cv2.waitKey(1) in [ord('q'), 27]:
-                break
-            frame_count += 1
+            # Headless runs have no display, so skip drawing entirely (stop with Ctrl+C)
+            if not headless:
+                if level is None or frame_index % level.overlay_every == 0:
+                    overlay_image = renderer.render(frame_data, detections,
+                                                    use_color=level is None or level.use_color)
+                    t = timer.lap("render", t)
+                    cv2.imshow('Depth Camera Piano', overlay_image)
+                key = cv2.waitKey(1)
+                t = timer.lap("display", t)
+                if key in [ord('q'), 27]:
+                    break
+            timer.end_frame(frame_start, frame_data)
+            if frame_index == 0:
+                startup.step("first frame")
+                startup.report()
+            frame_index += 1
+
+            if quality is not None:
+                new_level = quality.update((t - processing_start) * 1000.0)
+                if new_level is not None:
+                    level = new_level
+                    instrument.detector.stride = level.stride
+                    min_points = get_min_points(stream_decimation * level.stride)
+                    if recorder is None:  # A recording keeps one geometry throughout
+                        # Levels without color skip the color stream and its alignment too
+                        source.set_use_color(level.use_color)
             
+    except EOFError:
+        print("End of recording.")
+    except KeyboardInterrupt:
+        print("Stopped.")  # The way headless runs end; shut down and report below
     except Exception as e:
         print(e)
         raise
     finally:
-        if 'pipeline' in locals():
-            pipeline.stop()
+        if 'watcher' in locals() and watcher is not None:
+            watcher.stop()
+        if 'capture' in locals():
+            capture.stop()
+            print(f"Capture: {ring.captured} frames, {ring.dropped} dropped")
+        if 'recorder' in locals() and recorder is not None:
+            recorder.close()
+        if 'timer' in locals():
+            timer.report()
+            timer.close()
+        if 'source' in locals():
+            source.stop()
         if 'tone_gen' in locals():
             tone_gen.stop()
 
 if __name__ == "__main__":
+    startup = StartupProfile(MODULE_START)
+    startup.step("imports")
     parser = argparse.ArgumentParser(description="RealSense depth and color viewer with sector overlay.")
     parser.add_argument("--bag", type=str, help="Path to a .bag file to replay from.")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run detection and audio only, without rendering or a display window.")
+    parser.add_argument("--threaded-capture", action="store_true",
+                        help="Capture frames on a separate thread, always processing the newest frame.")
+    parser.add_argument("--ring-size", type=int, default=2,
+                        help="Number of frames buffered by the threaded capture before the oldest is dropped.")
+    parser.add_argument("--no-align", action="store_true",
+                        help="Detect on the native depth stream instead of aligning depth to color "
+                             "(always the case with --headless).")
+    parser.add_argument("--decimate", type=int, default=1,
+                        help="Decimation factor applied to the native depth stream (requires --no-align or --headless).")
+    parser.add_argument("--multiprocess", action="store_true",
+                        help="Run capture, detection and rendering in separate processes over shared memory.")
+    parser.add_argument("--record", type=str, help="Directory to record the processed frames into.")
+    parser.add_argument("--replay", type=str, help="Directory of a recording to replay instead of a camera.")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Use a generated depth scene with players walking along the sector rays.")
+    parser.add_argument("--fast-replay", action="store_true",
+                        help="Replay the recording (or synthetic scene) as fast as possible instead of in real time.")
+    parser.add_argument("--stats-interval", type=float, default=10.0,
+                        help="Seconds between per-stage timing summaries on the console (0 = only at exit).")
+    parser.add_argument("--stats-file", type=str,
+                        help="Append every timing summary as a JSON line to this file.")
+    parser.add_argument("--frame-budget-ms", type=float,
+                        help="Processing time per frame to hold by lowering detection resolution and "
+                             "overlay work when exceeded (default: no adaptation).")
+    parser.add_argument("--low-latency-audio", action="store_true",
+                        help="Use a small audio buffer fed by a synthesis thread instead of the default 4096 frames.")
+    parser.add_argument("--audio-buffer", type=int,
+                        help="Audio buffer size in frames (default: 256 with --low-latency-audio, else 4096).")
+    parser.add_argument("--instrument-cache", type=str, metavar="DIR",
+                        help="Keep compiled instruments in this directory and reuse them across restarts "
+                             "(default: compile on every start, which takes well under a millisecond).")
+    parser.add_argument("--config", type=str, default=CONFIG_PATH,
+                        help=f"Sector configuration file (default: {CONFIG_PATH}).")
+    parser.add_argument("--watch-config", action="store_true",
+                        help="Reload the config whenever it changes, without restarting the camera or audio "
+                             "(not with --multiprocess).")
+    parser.add_argument("--smoothing", choices=SMOOTHING_METHODS, default="ema",
+                        help="Smoothing of each sector's distance before it is mapped to a note.")
+    parser.add_argument("--note-hysteresis", type=float, default=HYSTERESIS_M,
+                        help="Meters the distance must move past a note edge before the note changes.")
+    parser.add_argument("--check-config", action="store_true",
+                        help="Validate the config, list the sectors and exit without opening any device.")
     args = parser.parse_args()
-    main(args.bag)
+    if args.check_config:
+        check_config(args.config)
+        raise SystemExit(0)
+    if args.multiprocess:
+        unsupported = unsupported_multiprocess_options(args.threaded_capture, args.record,
+                                                       args.frame_budget_ms, args.watch_config)
+        if unsupported:
+            parser.error(f"--multiprocess cannot be combined with {', '.join(unsupported)}")
+    main(args.bag, headless=args.headless, threaded_capture=args.threaded_capture, ring_size=args.ring_size,
+         align_depth=not args.no_align, decimation=args.decimate, multiprocess=args.multiprocess,
+         replay_dir=args.replay, realtime_replay=not args.fast_replay, record_dir=args.record,
+         synthetic=args.synthetic, stats_interval=args.stats_interval, stats_file=args.stats_file,
+         frame_budget_ms=args.frame_budget_ms, low_latency_audio=args.low_latency_audio,
+         audio_buffer=args.audio_buffer,
+         instrument_cache=args.instrument_cache,
+         watch_config=args.watch_config, config_path=args.config, startup=startup,
+         smoothing=args.smoothing, note_hysteresis_m=args.note_hysteresis)
@@ -0,0 +1,270 @@
+"""
+Optional multi-process version of the piano loop.
+
+    capture process --FrameSlot--> detect process --results--> main process (ToneGenerator)
+                                                  --FrameSlot--> render process (optional)
+
+Depth and color images travel through the slots of a SharedFrameRing, only the small
+FrameSlot messages and per-sector detection results are pickled. Detection and rendering
+skip to the newest frame they have and hand the stale slots back, so a slow stage drops
+frames instead of building up latency. The main process only filters distances into notes, which
+keeps the GIL free for the PortAudio callback. It feeds every detection result to the
+note filter, so its debounce counts detected frames just like the single-process loop.
+
+Ctrl+C is handled by the main process alone: the workers ignore SIGINT and are shut down
+through the stop event, so an interrupted run ends without a traceback per process.
+"""
+import multiprocessing as mp
+import queue
+import signal
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from src.io.frame_source import FrameSource
+from src.io.shared_frames import SharedFrameRing
+from src.detectors.sector_engine import MultiSectorDetector
+from src.piano.instrument_cache import InstrumentCache
+from src.piano.instrumentation import StageTimer
+from src.piano.tone_generator import ToneGenerator
+from src.piano.note_filter import HYSTERESIS_M, NoteFilter
+from src.piano.voices import NoteTables
+
+NUM_SLOTS = 4  # Shared frame slots; one being written, one detected, one rendered, one spare
+JOIN_TIMEOUT_S = 3.0
+
+
+def _get_latest(message_queue, release: Callable = None, timeout: Optional[float] = None):
+    """Block for a message, then skip ahead to the newest one, releasing the skipped ones.
+
+    Returns None when the producer signalled the end of the stream, and raises queue.Empty
+    on timeout.
+    """
+    message = message_queue.get(timeout=timeout)
+    while message is not None:
+        try:
+            newer = message_queue.get_nowait()
+        except queue.Empty:
+            break
+        if release is not None:
+            release(message)
+        message = newer
+    return message
+
+
+def _drain(message_queue, timeout: Optional[float] = None) -> list:
+    """Block for a message, then return it with every message already waiting, oldest first.
+
+    Stops after a None (end of stream), and raises queue.Empty on timeout.
+    """
+    messages = [message_queue.get(timeout=timeout)]
+    while messages[-1] is not None:
+        try:
+            messages.append(message_queue.get_nowait())
+        except queue.Empty:
+            break
+    return messages
+
+
+def _capture_worker(source: FrameSource, enable_color, slots, detect_queue, free_slots, stop_event):
+    """Owns the frame source and copies every frame into a free shared slot."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The main process stops us through stop_event
+    source.start()
+    ring = None
+    sequence = 0
+    dropped = 0
+    try:
+        while not stop_event.is_set():
+            try:
+                frame_data = source.read()
+            except EOFError:
+                break
+            if frame_data is None:
+                continue
+            if enable_color and frame_data.color_image is None and frame_data.color_loader is not None:
+                frame_data.color_image = frame_data.color_loader()
+
+            if ring is None:
+                # The slot size is only known once the first frame arrives
+                color = frame_data.color_image if enable_color else None
+                ring = SharedFrameRing.create(slots, frame_data.depth_image.shape,
+                                              color.shape if color is not None else None)
+                detect_queue.put(ring.layout)
+                for slot in range(slots):
+                    free_slots.put(slot)
+
+            try:
+                slot = free_slots.get_nowait()
+            except queue.Empty:
+                dropped += 1  # Every slot is still in use downstream
+                continue
+            detect_queue.put(ring.write(slot, sequence, frame_data))
+            sequence += 1
+    finally:
+        detect_queue.put(None)
+        source.stop()
+        print(f"Capture: {sequence} frames shared, {dropped} dropped")
+        if ring is not None:
+            ring.close()
+            ring.unlink()
+
+
+def _detect_worker(sectors, min_points, detect_queue, free_slots, render_queue, result_queue,
+                   instrument_cache=None):
+    """Runs the compiled detector on each shared frame and sends out small results."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ends with the capture stream
+    layout = detect_queue.get()
+    if layout is None:
+        result_queue.put(None)
+        if render_queue is not None:
+            render_queue.put(None)
+        return
+    ring = SharedFrameRing.attach(layout)
+    if render_queue is not None:
+        render_queue.put(layout)
+
+    detector = MultiSectorDetector(sectors, cache=InstrumentCache(instrument_cache) if instrument_cache else None)
+    release = lambda frame_slot: free_slots.put(frame_slot.slot)
+    try:
+        while True:
+            frame_slot = _get_latest(detect_queue, release)
+            if frame_slot is None:
+                break
+            frame_data = ring.read(frame_slot)
+            detections = [
+                (index, detection)
+                for index, detection in enumerate(detector.detect(frame_data))
+                if detection is not None and detection.num_valid_points > min_points
+            ]
+            frame_data = None
+            result_queue.put([
+                (index, detection.min_distance_m, detection.num_valid_points)
+                for index, detection in detections
+            ])
+            if render_queue is not None:
+                render_queue.put((frame_slot, detections))  # The renderer releases the slot
+            else:
+                release(frame_slot)
+    finally:
+        result_queue.put(None)
+        if render_queue is not None:
+            render_queue.put(None)
+        ring.close()
+
+
+def _render_worker(sectors_with_mappers, render_queue, free_slots, stop_event):
+    """Draws the overlay for the newest detected frame and handles the quit keys."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ends with the detection stream
+    # Only the render process needs OpenCV, headless runs never import it
+    import cv2
+    from src.piano.renderer import SectorOverlayRenderer
+
+    layout = render_queue.get()
+    if layout is None:
+        return
+    ring = SharedFrameRing.attach(layout)
+    renderer = SectorOverlayRenderer()
+    release = lambda item: free_slots.put(item[0].slot)
+    try:
+        while True:
+            item = _get_latest(render_queue, release)
+            if item is None:
+                break
+            frame_slot, detections = item
+            frame_data = ring.read(frame_slot)
+            overlay_image = renderer.render(
+                frame_data, [(detection, sectors_with_mappers[index]) for index, detection in detections]
+            )
+            frame_data = None
+            free_slots.put(frame_slot.slot)
+            cv2.imshow('Depth Camera Piano', overlay_image)
+            if cv2.waitKey(1) in [ord('q'), 27]:
+                stop_event.set()
+    finally:
+        ring.close()
+        cv2.destroyAllWindows()
+
+
+def run_multiprocess_pipeline(sectors_with_mappers: List, min_points: int, source: FrameSource,
+                              headless: bool = False, slots: int = NUM_SLOTS,
+                              low_latency_audio: bool = False, audio_buffer: Optional[int] = None,
+                              instrument_cache: Optional[str] = None, smoothing: str = "ema",
+                              note_hysteresis_m: float = HYSTERESIS_M, stats_interval: float = 10.0,
+                              stats_file: Optional[str] = None) -> None:
+    """Run capture, detection and (unless headless) rendering in separate processes.
+
+    `source` must not be started yet, it is started inside the capture process.
+    The calling process owns the ToneGenerator and returns when the stream ends, the
+    overlay window is closed with q/Esc, or on Ctrl+C. Its stats cover the detection
+    results it receives: the wait for each one and the note filtering.
+    """
+    # librealsense and OpenCV state must not be forked, always start fresh interpreters
+    ctx = mp.get_context("spawn")
+    stop_event = ctx.Event()
+    detect_queue = ctx.Queue()
+    free_slots = ctx.Queue()
+    result_queue = ctx.Queue()
+    render_queue = None if headless else ctx.Queue()
+
+    processes = [
+        ctx.Process(target=_capture_worker, name="piano-capture",
+                    args=(source, not headless, slots, detect_queue, free_slots, stop_event)),
+        ctx.Process(target=_detect_worker, name="piano-detect",
+                    args=([swm.sector for swm in sectors_with_mappers], min_points,
+                          detect_queue, free_slots, render_queue, result_queue, instrument_cache)),
+    ]
+    if not headless:
+        processes.append(ctx.Process(target=_render_worker, name="piano-render",
+                                     args=(sectors_with_mappers, render_queue, free_slots, stop_event)))
+    # Children inherit an ignored SIGINT, so a Ctrl+C while they start up cannot reach them
+    default_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        for process in processes:
+            process.start()
+    finally:
+        signal.signal(signal.SIGINT, default_handler)
+
+    tone_gen = ToneGenerator(num_voices=len(sectors_with_mappers),
+                             timbres=[swm.timbre for swm in sectors_with_mappers],
+                             low_latency=low_latency_audio, buffer_size=audio_buffer)
+    note_filter = NoteFilter(NoteTables([swm.mapper for swm in sectors_with_mappers]), smoothing,
+                             hysteresis_m=note_hysteresis_m)
+    distances = np.empty(len(sectors_with_mappers))  # One voice per sector
+    timer = StageTimer(stats_interval, stats_file, measure_age=False)
+    try:
+        tone_gen.start()
+        while not stop_event.is_set():
+            wait_start = timer.now()
+            try:
+                messages = _drain(result_queue, timeout=0.5)
+            except queue.Empty:
+                if not all(process.is_alive() for process in processes):
+                    break
+                continue
+            t = timer.lap("wait", wait_start)
+            # Every result advances the filter, so its debounce counts detected frames
+            changed = False
+            for results in messages:
+                if results is None:
+                    break
+                distances.fill(np.nan)  # Sectors without a detection fall silent
+                for index, min_distance_m, _ in results:
+                    distances[index] = min_distance_m
+                changed |= len(note_filter.update(distances)) > 0
+            if changed:  # Only note changes reach the audio side
+                tone_gen.set_frequencies(note_filter.frequencies)
+            timer.lap("filter", t)
+            timer.end_frame(wait_start)
+            if messages[-1] is None:
+                break
+    except KeyboardInterrupt:
+        pass  # Shut down below like at the end of the stream
+    finally:
+        stop_event.set()
+        tone_gen.stop()
+        for process in processes:
+            process.join(JOIN_TIMEOUT_S)
+            if process.is_alive():
+                process.terminate()
+        timer.report()
+        timer.close()
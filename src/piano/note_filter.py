@@ -0,0 +1,139 @@
+"""
+Temporal filtering between sector detection and audio.
+
+Raw per-frame minimum distances are noisy, so a player standing near the edge between
+two notes makes the note flicker, and a single dropped detection cuts the note. The
+NoteFilter keeps per-sector state as arrays and updates all sectors at once each frame:
+
+    smoothing   exponential moving average or running median of each sector's distance
+    debounce    a sector's note starts after on_frames detected frames in a row and
+                stops after off_frames frames without a detection
+    hysteresis  a sounding note only changes once the smoothed distance is more than
+                hysteresis_m past the edges of its section
+
+update() returns only the sectors whose note changed, so the audio side is only
+touched on real note transitions.
+"""
+from typing import Dict
+import numpy as np
+
+from src.piano.voices import NoteTables
+
+SMOOTHING_METHODS = ("ema", "median", "none")
+EMA_ALPHA = 0.5       # Weight of the newest distance in the moving average
+MEDIAN_FRAMES = 5     # Distances kept per sector for the running median
+HYSTERESIS_M = 0.03   # Distance past a note edge before the note changes
+ON_FRAMES = 2         # Detected frames in a row before a note starts
+OFF_FRAMES = 3        # Frames in a row without a detection before a note stops
+
+# One note change: the sector's new note index (into its mapper's ranges) and frequency,
+# note -1 and frequency 0 for a note-off
+NOTE_EVENT_DTYPE = np.dtype([
+    ("sector", np.int32),
+    ("note", np.int32),
+    ("frequency", np.float64),
+])
+
+
+class NoteFilter:
+    """Smoothed, debounced note state of every sector, see the module docstring.
+
+    After update(), `notes` and `frequencies` hold the current note of every sector
+    (-1 and 0 when silent) and `distances` the smoothed distances.
+    """
+
+    def __init__(self, note_tables: NoteTables, smoothing: str = "ema", alpha: float = EMA_ALPHA,
+                 median_frames: int = MEDIAN_FRAMES, hysteresis_m: float = HYSTERESIS_M,
+                 on_frames: int = ON_FRAMES, off_frames: int = OFF_FRAMES):
+        if smoothing not in SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing '{smoothing}', expected one of {', '.join(SMOOTHING_METHODS)}")
+        self.note_tables = note_tables
+        self.smoothing = smoothing
+        self.alpha = alpha
+        self.hysteresis_m = hysteresis_m
+        self.on_frames = max(on_frames, 1)
+        self.off_frames = max(off_frames, 1)
+
+        num_sectors = len(note_tables.num_notes)
+        self.notes = np.full(num_sectors, -1, dtype=np.int64)
+        self.frequencies = np.zeros(num_sectors)
+        self.distances = np.full(num_sectors, np.nan)
+        self.active = np.zeros(num_sectors, dtype=bool)
+        self._present_run = np.zeros(num_sectors, dtype=np.int64)
+        self._absent_run = np.zeros(num_sectors, dtype=np.int64)
+        self._history = np.full((num_sectors, max(median_frames, 1)), np.nan)  # Median smoothing only
+        self._history_pos = 0
+
+    def carry_over(self, previous: "NoteFilter", sectors: Dict[int, int]) -> None:
+        """Take over the state of previous's sector `old` for every `new: old` in sectors.
+
+        Used when the instrument is reloaded: unchanged sectors keep their note and their
+        smoothing and debounce state, so they neither retrigger nor fall silent. The other
+        sectors start silent. Both filters must use the same median_frames.
+        """
+        if not sectors:
+            return
+        new = np.fromiter(sectors.keys(), dtype=np.int64, count=len(sectors))
+        old = np.fromiter(sectors.values(), dtype=np.int64, count=len(sectors))
+        self.notes[new] = previous.notes[old]
+        self.frequencies = self.note_tables.note_frequencies(self.notes)
+        self.distances[new] = previous.distances[old]
+        self.active[new] = previous.active[old]
+        self._present_run[new] = previous._present_run[old]
+        self._absent_run[new] = previous._absent_run[old]
+        self._history[new] = previous._history[old]
+        self._history_pos = previous._history_pos
+
+    def _smooth(self, distances: np.ndarray, detected: np.ndarray) -> None:
+        """Fold the detected distances into self.distances, undetected sectors keep theirs."""
+        if self.smoothing == "ema":
+            fresh = detected & np.isnan(self.distances)
+            self.distances = np.where(detected, self.distances + self.alpha * (distances - self.distances), self.distances)
+            self.distances[fresh] = distances[fresh]
+        elif self.smoothing == "median":
+            self._history[detected, self._history_pos] = distances[detected]
+            self._history[~detected, self._history_pos] = np.nan
+            self._history_pos = (self._history_pos + 1) % self._history.shape[1]
+            # NaNs sort last, so the median of the k valid entries sits at (k - 1) // 2 and k // 2
+            ordered = np.sort(self._history, axis=1)
+            counts = np.count_nonzero(~np.isnan(ordered), axis=1)
+            rows = np.arange(len(counts))
+            medians = 0.5 * (ordered[rows, np.maximum(counts - 1, 0) // 2] + ordered[rows, counts // 2])
+            self.distances = np.where(counts > 0, medians, self.distances)
+        else:
+            self.distances = np.where(detected, distances, self.distances)
+
+    def update(self, distances: np.ndarray) -> np.ndarray:
+        """Advance one frame with the raw distance of every sector (NaN = no detection).
+
+        Returns the note changes as a NOTE_EVENT_DTYPE array, empty when nothing changed.
+        """
+        distances = np.asarray(distances, dtype=np.float64)
+        detected = ~np.isnan(distances)
+        self._present_run = np.where(detected, self._present_run + 1, 0)
+        self._absent_run = np.where(detected, 0, self._absent_run + 1)
+        self._smooth(distances, detected)
+
+        # Debounced note-on and note-off; released sectors start smoothing afresh
+        turn_on = ~self.active & (self._present_run >= self.on_frames)
+        turn_off = self.active & (self._absent_run >= self.off_frames)
+        self.active = (self.active | turn_on) & ~turn_off
+        self.distances[turn_off] = np.nan
+        self._history[turn_off] = np.nan
+
+        # A sounding note only moves once the distance is clearly past its section
+        candidates, _ = self.note_tables.lookup(np.where(self.active, self.distances, np.nan))
+        low, high = self.note_tables.section_bounds(np.maximum(self.notes, 0))
+        outside = (self.distances < low - self.hysteresis_m) | (self.distances >= high + self.hysteresis_m)
+        switch = (candidates >= 0) & ((self.notes < 0) | ((candidates != self.notes) & outside))
+        notes = np.where(self.active, np.where(switch, candidates, self.notes), -1)
+
+        changed = np.flatnonzero(notes != self.notes)
+        self.notes = notes
+        self.frequencies = self.note_tables.note_frequencies(notes)
+        events = np.zeros(len(changed), dtype=NOTE_EVENT_DTYPE)
+        events["sector"] = changed
+        events["note"] = notes[changed]
+        events["frequency"] = self.frequencies[changed]
+        return events
+
@@ -0,0 +1,69 @@
+"""
+Offline rendering of compiled note events to a NumPy buffer or a WAV file.
+
+Uses the same OscillatorBank and Sequencer as the live ToneGenerator, so previews sound
+and are timed like the piano, but renders in large blocks without an audio device and
+much faster than real time. render_batch renders many songs in parallel with a process
+pool.
+"""
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+import numpy as np
+
+from src.piano.synth import RELEASE_S, OscillatorBank
+from src.piano.sequencer import Sequencer
+
+SAMPLE_RATE = 44100
+BLOCK_FRAMES = 16384  # Larger than any live buffer, the offline render has no latency budget
+
+
+@dataclass
+class RenderJob:
+    """One song for render_batch."""
+    name: str
+    events: np.ndarray  # Compiled EVENT_DTYPE array, see src/piano/sequencer.py
+    output_path: str
+    num_voices: int
+    timbres: Optional[List[str]] = None
+    sample_rate: int = SAMPLE_RATE
+
+
+def render_sequence(events: np.ndarray, num_voices: int, sample_rate: int = SAMPLE_RATE,
+                    timbres: Optional[Sequence[str]] = None, tail_s: float = RELEASE_S) -> np.ndarray:
+    """Render a compiled event array to a mono float32 buffer, followed by tail_s for the releases."""
+    bank = OscillatorBank(num_voices, sample_rate, BLOCK_FRAMES, timbres=timbres)
+    sequencer = Sequencer(events, num_voices)
+    total = sequencer.end_sample + int(round(tail_s * sample_rate))
+    output = np.zeros(total, dtype=np.float32)
+    for position in range(0, total, BLOCK_FRAMES):
+        sequencer.render(bank, position, output[position:position + BLOCK_FRAMES])
+    return output
+
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> None:
+    """Write mono float samples in [-1, 1] as a 16-bit PCM WAV file."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(pcm.tobytes())
+
+
+def render_job(job: RenderJob) -> str:
+    """Render one job to its WAV file and return the path."""
+    samples = render_sequence(job.events, job.num_voices, job.sample_rate, job.timbres)
+    directory = os.path.dirname(job.output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_wav(job.output_path, samples, job.sample_rate)
+    return job.output_path
+
+
+def render_batch(jobs: Sequence[RenderJob], processes: Optional[int] = None) -> List[str]:
+    """Render many jobs in parallel worker processes; returns the WAV paths in job order."""
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(render_job, jobs))
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """How much work the piano loop does per frame."""
+    stride: int = 1         # Pixel stride of the sector detection in each direction
+    overlay_every: int = 1  # Render the overlay on every n-th frame only
+    use_color: bool = True  # Draw on the color image instead of the depth colormap
+
+    def describe(self) -> str:
+        return (f"detection stride {self.stride}, overlay every {self.overlay_every} frame(s), "
+                f"{'color' if self.use_color else 'depth colormap'}")
+
+
+# Best to cheapest. The overlay is given up first since it does not affect the sound.
+QUALITY_LEVELS = (
+    QualityLevel(stride=1, overlay_every=1, use_color=True),
+    QualityLevel(stride=1, overlay_every=2, use_color=True),
+    QualityLevel(stride=1, overlay_every=2, use_color=False),
+    QualityLevel(stride=2, overlay_every=3, use_color=False),
+    QualityLevel(stride=4, overlay_every=4, use_color=False),
+)
+
+
+class AdaptiveQualityController:
+    """Steps through quality levels to keep the per-frame processing time within a budget.
+
+    Frame times are averaged over windows of `window` frames. A window over the budget
+    steps one level down right away; stepping back up needs `recover_windows` windows in a
+    row below `headroom` x budget, so the loop does not oscillate around the budget.
+    Every change is printed.
+    """
+
+    def __init__(self, budget_ms: float, levels: Sequence[QualityLevel] = QUALITY_LEVELS,
+                 window: int = 30, headroom: float = 0.6, recover_windows: int = 3):
+        self.budget_ms = budget_ms
+        self.levels = list(levels)
+        self.window = window
+        self.headroom = headroom
+        self.recover_windows = recover_windows
+        self.index = 0
+        self._samples: List[float] = []
+        self._fast_windows = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    def update(self, frame_ms: float) -> Optional[QualityLevel]:
+        """Add a frame's processing time; returns the new level when it changed, else None."""
+        self._samples.append(frame_ms)
+        if len(self._samples) < self.window:
+            return None
+        mean_ms = sum(self._samples) / len(self._samples)
+        self._samples.clear()
+
+        if mean_ms > self.budget_ms:
+            self._fast_windows = 0
+            if self.index + 1 < len(self.levels):
+                return self._set_level(self.index + 1, mean_ms)
+        elif mean_ms < self.headroom * self.budget_ms and self.index > 0:
+            self._fast_windows += 1
+            if self._fast_windows >= self.recover_windows:
+                self._fast_windows = 0
+                return self._set_level(self.index - 1, mean_ms)
+        else:
+            self._fast_windows = 0
+        return None
+
+    def _set_level(self, index: int, mean_ms: float) -> QualityLevel:
+        direction = "down" if index > self.index else "up"
+        self.index = index
+        print(f"Quality {direction} to level {index} ({self.level.describe()}): "
+              f"frame time {mean_ms:.1f} ms, budget {self.budget_ms:.1f} ms")
+        return self.level
@@ -0,0 +1,133 @@
+import numpy as np
+import cv2
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from src.io.frames import FrameData
+from src.detectors.angular_detector import SectorDetection
+
+OVERLAY_ALPHA = 0.4  # Weight of the note colors added on top of the camera image
+TINT_ALPHA = 0.3     # Weight of the sector color blended into the detected points
+TINT_INTENSITY = 0.7  # Sector color is tinted in at 70% intensity
+TEXT_LINE_Y = (25, 50, 75, 100)  # Baselines of the four text lines drawn per sector
+
+
+@lru_cache(maxsize=None)
+def get_discrete_color(index: int, total: int) -> tuple[int, int, int]:
+    """
+    Generate a discrete color from a continuous HSV colormap.
+    The hue is spread evenly over the range [0, 180] (OpenCV HSV hue range).
+    Results are cached since there are only a handful of (index, total) pairs.
+    """
+    hue = int((index / total) * 180)
+    hsv = np.uint8([[[hue, 255, 255]]])
+    bgr = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0][0]
+    return tuple(int(c) for c in bgr)
+
+
+class SectorOverlayRenderer:
+    """Draws all sector detections with a single blend per frame.
+
+    Each detected sector writes its slot number into one label image, a palette lookup
+    turns the labels into a color layer, and that layer is blended once into a
+    preallocated output buffer. The display cost therefore stays flat as sectors are
+    added. The returned image is reused on the next call, so show or copy it first.
+
+    A detected point shows the camera image tinted with its sector's color plus the
+    color of the current note. Both are folded into the one palette entry per sector:
+    the blend dims the whole image by the tint weight and adds the palette color, and
+    the points outside any sector are copied back undimmed.
+    """
+
+    def __init__(self, alpha: float = OVERLAY_ALPHA, tint_alpha: float = TINT_ALPHA):
+        self.alpha = alpha
+        self.tint_alpha = tint_alpha
+        self._shape = None
+        self._labels = None       # (height, width) uint8, 0 = no sector
+        self._background = None   # (height, width) uint8 mask, 255 where labels == 0
+        self._color_layer = None  # (height, width, 3) palette lookup of the labels
+        self._output = None       # (height, width, 3) blended result
+        self._text_x: Dict[tuple, int] = {}
+
+    def _allocate(self, shape: tuple) -> None:
+        """(Re)allocate the per-frame buffers for a new image shape."""
+        self._shape = shape
+        self._labels = np.zeros(shape[:2], dtype=np.uint8)
+        self._background = np.zeros(shape[:2], dtype=np.uint8)
+        self._color_layer = np.zeros(shape, dtype=np.uint8)
+        self._output = np.zeros(shape, dtype=np.uint8)
+        self._text_x.clear()
+
+    def _get_text_x(self, name: str, azimuth_center: float, frame_data: FrameData, img_width: int) -> int:
+        """Cached text x position for a sector, from its azimuth_center and the camera FOV."""
+        intrinsics = frame_data.depth_intrinsics
+        key = (name, azimuth_center, intrinsics.width, intrinsics.fx, img_width)
+        x_pos = self._text_x.get(key)
+        if x_pos is None:
+            # Calculate the horizontal FOV of the camera from intrinsics.
+            h_fov = 2 * np.rad2deg(np.arctan(intrinsics.width / (2 * intrinsics.fx)))
+            x_pos = int(((azimuth_center + h_fov/2) / h_fov) * img_width)
+            self._text_x[key] = x_pos
+        return x_pos
+
+    def _paint_labels(self, detection: SectorDetection, slot: int) -> None:
+        """Write a detection's slot into the label image, one stride x stride block per sample."""
+        if detection.stride == 1:
+            self._labels[detection.roi][detection.valid_mask] = slot
+            return
+        step = detection.stride
+        block = np.repeat(np.repeat(detection.valid_mask, step, axis=0), step, axis=1)
+        row, col = detection.offset
+        target = self._labels[row:row + block.shape[0], col:col + block.shape[1]]
+        target[block[:target.shape[0], :target.shape[1]]] = slot
+
+    def render(self, frame_data: FrameData, detections: List[Tuple[SectorDetection, object]],
+               use_color: bool = True) -> np.ndarray:
+        """
+        Overlay (SectorDetection, SectorWithMapper) pairs on the color image using text that
+        reflects the ray configuration. The detected points are tinted with the sector color,
+        and the text and overlay color for each sector is chosen based on the discrete color
+        corresponding to the note range.
+        With use_color=False the depth colormap is used, which skips any color conversion
+        or alignment.
+        """
+        image = frame_data.color_image_rgb if use_color else frame_data.depth_colormap_image
+        if image.shape != self._shape:
+            self._allocate(image.shape)
+
+        # Paint every detection into the label image, slot 0 is "no sector"
+        self._labels.fill(0)
+        palette = np.zeros((len(detections) + 1, 3), dtype=np.uint8)
+        text_items = []
+        for slot, (detection, swm) in enumerate(detections, start=1):
+            # Note interval of detection.min_distance_m, a searchsorted in the mapper's table
+            note_index = swm.mapper.get_note_index(detection.min_distance_m)
+            discrete_color = get_discrete_color(note_index, len(swm.mapper.ranges))
+
+            # Sector tint and note color, both added on top of the dimmed image
+            tint = self.tint_alpha * TINT_INTENSITY * np.array(swm.sector.color, dtype=np.float64)
+            palette[slot] = np.clip(np.rint(tint + self.alpha * np.array(discrete_color)), 0, 255)
+            self._paint_labels(detection, slot)
+            text_items.append((detection, swm, discrete_color, note_index))
+
+        # One palette lookup and one blend for all sectors, then undo the dimming outside them
+        np.take(palette, self._labels, axis=0, out=self._color_layer)
+        cv2.addWeighted(image, 1 - self.tint_alpha, self._color_layer, 1.0, 0, dst=self._output)
+        cv2.compare(self._labels, 0, cv2.CMP_EQ, dst=self._background)
+        cv2.copyTo(image, self._background, dst=self._output)
+
+        img_width = image.shape[1]
+        for detection, swm, discrete_color, note_index in text_items:
+            x_pos = self._get_text_x(swm.sector.name, swm.sector.bounds.azimuth_center, frame_data, img_width)
+            note_label = swm.mapper.notes[note_index] if swm.mapper.notes else ""
+            lines = (
+                f"{swm.sector.name}",
+                f"Dist: {detection.min_distance_m:.1f}m",
+                f"Note: {note_label}",
+                f"Points: {detection.num_valid_points}",
+            )
+            for text, y_pos in zip(lines, TEXT_LINE_Y):
+                cv2.putText(self._output, text, (x_pos, y_pos),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, discrete_color, 2)
+
+        return self._output
@@ -0,0 +1,69 @@
+"""
+Equal-tempered scales in any key and mode.
+
+Notes are named like "C4", "F#3" or "Bb5" (scientific pitch notation, MIDI 60 = C4) and
+tuned relative to A4. generate_scale returns an ordered note name -> frequency dict,
+lowest note first.
+"""
+from typing import Dict
+
+A4_HZ = 440.0
+A4_MIDI = 69
+
+NOTE_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+_PITCH_CLASSES = {name: index for index, name in enumerate(NOTE_NAMES)}
+_PITCH_CLASSES.update({"Db": 1, "Eb": 3, "Gb": 6, "Ab": 8, "Bb": 10, "Cb": 11, "Fb": 4, "E#": 5, "B#": 0})
+
+# Semitone steps from the tonic of every mode
+MODES = {
+    "major": (0, 2, 4, 5, 7, 9, 11),
+    "ionian": (0, 2, 4, 5, 7, 9, 11),
+    "dorian": (0, 2, 3, 5, 7, 9, 10),
+    "phrygian": (0, 1, 3, 5, 7, 8, 10),
+    "lydian": (0, 2, 4, 6, 7, 9, 11),
+    "mixolydian": (0, 2, 4, 5, 7, 9, 10),
+    "minor": (0, 2, 3, 5, 7, 8, 10),
+    "aeolian": (0, 2, 3, 5, 7, 8, 10),
+    "locrian": (0, 1, 3, 5, 6, 8, 10),
+    "harmonic_minor": (0, 2, 3, 5, 7, 8, 11),
+    "pentatonic": (0, 2, 4, 7, 9),
+    "minor_pentatonic": (0, 3, 5, 7, 10),
+    "blues": (0, 3, 5, 6, 7, 10),
+    "chromatic": tuple(range(12)),
+}
+
+
+def note_to_midi(note: str) -> int:
+    """MIDI number of a note name such as "C4", "F#3" or "Bb5"."""
+    pitch, octave = note[:-1], note[-1:]
+    if note[-2:-1] == "-":  # Octave -1, the lowest MIDI octave
+        pitch, octave = note[:-2], note[-2:]
+    if pitch not in _PITCH_CLASSES or not octave.lstrip("-").isdigit():
+        raise ValueError(f"Invalid note name: '{note}'")
+    return (int(octave) + 1) * 12 + _PITCH_CLASSES[pitch]
+
+
+def midi_to_note(midi: int) -> str:
+    """Note name (with sharps) of a MIDI number."""
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+def midi_to_frequency(midi: float, a4: float = A4_HZ) -> float:
+    """Equal-tempered frequency in Hz."""
+    return a4 * 2.0 ** ((midi - A4_MIDI) / 12.0)
+
+
+def generate_scale(key: str = "C", mode: str = "major", lowest_note: str = "C2",
+                   highest_note: str = "C8", a4: float = A4_HZ) -> Dict[str, float]:
+    """All notes of the key and mode between lowest_note and highest_note (inclusive)."""
+    if key not in _PITCH_CLASSES:
+        raise ValueError(f"Invalid key: '{key}'")
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {', '.join(MODES)}")
+    tonic = _PITCH_CLASSES[key]
+    pitch_classes = {(tonic + step) % 12 for step in MODES[mode]}
+    return {
+        midi_to_note(midi): midi_to_frequency(midi, a4)
+        for midi in range(note_to_midi(lowest_note), note_to_midi(highest_note) + 1)
+        if midi % 12 in pitch_classes
+    }
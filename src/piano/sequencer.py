@@ -0,0 +1,163 @@
+"""
+Sample-clocked note sequencing for the ToneGenerator and the offline renderer.
+
+Songs are written in beats (SequenceNote) with an optional tempo map (TempoChange) and
+compiled once into a sorted structured array of voice events at absolute sample
+positions. The Sequencer walks that array while audio is rendered and cuts every block
+at the event samples, so timing follows the audio sample clock exactly instead of
+the sleep/scheduler timing of the control thread, and any number of voices can change
+on the same sample.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# One voice change: note-ons carry the note's frequency and amplitude, note-offs 0 for both
+EVENT_DTYPE = np.dtype([
+    ("sample", np.int64),
+    ("voice", np.int32),
+    ("frequency", np.float64),
+    ("amplitude", np.float64),
+])
+
+
+@dataclass
+class SequenceNote:
+    """A note on one voice, starting at `beat` and lasting `beats` beats."""
+    beat: float
+    beats: float
+    voice: int
+    frequency: float
+    amplitude: float = 1.0
+
+
+@dataclass
+class TempoChange:
+    """From `beat` on, the song runs at `bpm` beats per minute."""
+    beat: float
+    bpm: float
+
+
+def beats_to_seconds(beats: np.ndarray, tempo_changes: Sequence[TempoChange]) -> np.ndarray:
+    """Convert beat positions to seconds through a piecewise constant tempo map."""
+    changes = sorted(tempo_changes, key=lambda change: change.beat)
+    if not changes or changes[0].beat > 0:
+        raise ValueError("The tempo map needs a tempo at beat 0.")
+    change_beats = np.array([change.beat for change in changes])
+    seconds_per_beat = 60.0 / np.array([change.bpm for change in changes])
+    # Time at which every tempo change starts
+    change_seconds = np.concatenate(([0.0], np.cumsum(np.diff(change_beats) * seconds_per_beat[:-1])))
+    segment = np.searchsorted(change_beats, beats, side="right") - 1
+    return change_seconds[segment] + (beats - change_beats[segment]) * seconds_per_beat[segment]
+
+
+def compile_events(start_s: np.ndarray, duration_s: np.ndarray, voices: np.ndarray,
+                   frequencies: np.ndarray, amplitudes: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Sorted EVENT_DTYPE array with a note-on and a note-off per note.
+
+    At equal samples note-offs sort before note-ons, so a note that starts exactly where
+    the previous note on the same voice ends is not cut off.
+    """
+    count = len(start_s)
+    events = np.zeros(2 * count, dtype=EVENT_DTYPE)
+    events["sample"][:count] = np.rint(np.asarray(start_s) * sample_rate)
+    events["sample"][count:] = np.rint((np.asarray(start_s) + np.asarray(duration_s)) * sample_rate)
+    events["voice"][:count] = voices
+    events["voice"][count:] = voices
+    events["frequency"][:count] = frequencies
+    events["amplitude"][:count] = amplitudes
+    order = np.lexsort((events["frequency"] > 0, events["sample"]))
+    return events[order]
+
+
+def compile_sequence(notes: Sequence[SequenceNote], tempo_changes: Sequence[TempoChange],
+                     sample_rate: int) -> np.ndarray:
+    """Compile notes in beats into a sorted EVENT_DTYPE array, see compile_events."""
+    beats = np.array([note.beat for note in notes], dtype=np.float64)
+    ends = np.array([note.beat + note.beats for note in notes], dtype=np.float64)
+    start_s = beats_to_seconds(beats, tempo_changes)
+    return compile_events(
+        start_s, beats_to_seconds(ends, tempo_changes) - start_s,
+        np.array([note.voice for note in notes], dtype=np.int32),
+        np.array([note.frequency for note in notes], dtype=np.float64),
+        np.array([note.amplitude for note in notes], dtype=np.float64),
+        sample_rate
+    )
+
+
+def orchestration_to_notes(orchestration: List[dict], voices: Dict[str, int],
+                           beats_per_note: float = 1.0) -> List[SequenceNote]:
+    """Turn convert_melody output (one note after another) into SequenceNotes.
+
+    `voices` maps sector names to voice indices; unmapped notes become rests.
+    """
+    return [
+        SequenceNote(step * beats_per_note, beats_per_note, voices[item["sector"]], item["frequency"])
+        for step, item in enumerate(orchestration)
+        if item["frequency"] is not None and item["sector"] in voices
+    ]
+
+
+class Sequencer:
+    """Plays a compiled event array on an OscillatorBank against its sample clock.
+
+    render() is called with the sample clock at the start of each block and writes the
+    block into `out`, applying every event on its exact sample. With `block_time` (the
+    time, on any monotonic clock, at which the block's first sample is heard) it also
+    records when each event is heard; jitter() reports how much that varies against the
+    event's nominal time, which is what a listener perceives as timing jitter.
+    """
+
+    def __init__(self, events: np.ndarray, num_voices: int, start_sample: int = 0):
+        self.events = events
+        self.start_sample = start_sample  # Sample clock value of the song's sample 0
+        self.index = 0
+        self._frequencies = np.zeros(num_voices)
+        self._amplitudes = np.zeros(num_voices)
+        self._heard_s = np.full(len(events), np.nan)
+
+    @property
+    def finished(self) -> bool:
+        return self.index >= len(self.events)
+
+    @property
+    def end_sample(self) -> int:
+        """Sample clock value of the last event."""
+        return self.start_sample + (int(self.events["sample"][-1]) if len(self.events) else 0)
+
+    def render(self, bank, clock: int, out: np.ndarray, block_time: Optional[float] = None) -> None:
+        """Render len(out) samples starting at sample clock `clock` into out."""
+        samples = self.events["sample"]
+        end = clock + len(out)
+        position = clock
+        while self.index < len(self.events):
+            event_sample = self.start_sample + int(samples[self.index])
+            if event_sample >= end:
+                break
+            if event_sample > position:
+                out[position - clock:event_sample - clock] = bank.render(event_sample - position)
+                position = event_sample
+            # Every event on this sample at once
+            stop = int(np.searchsorted(samples, samples[self.index], side="right"))
+            batch = self.events[self.index:stop]
+            self._frequencies[batch["voice"]] = batch["frequency"]
+            self._amplitudes[batch["voice"]] = batch["amplitude"]
+            bank.update_targets(self._frequencies, self._amplitudes)  # In place, we are the audio thread
+            if block_time is not None:
+                self._heard_s[self.index:stop] = block_time + (event_sample - clock) / bank.sample_rate
+            self.index = stop
+        if end > position:
+            out[position - clock:] = bank.render(end - position)
+
+    def jitter(self, sample_rate: int) -> Optional[dict]:
+        """Spread (in ms) of heard minus nominal event time, after removing the mean latency."""
+        heard = ~np.isnan(self._heard_s)
+        if not np.any(heard):
+            return None
+        offsets_ms = (self._heard_s[heard] - self.events["sample"][heard] / sample_rate) * 1000.0
+        offsets_ms -= offsets_ms.mean()
+        return {
+            "events": int(heard.sum()),
+            "std_ms": float(offsets_ms.std()),
+            "peak_to_peak_ms": float(offsets_ms.max() - offsets_ms.min()),
+        }
@@ -0,0 +1,239 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence
+import numpy as np
+
+from src.piano.wavetables import (
+    DEFAULT_TIMBRE, LOWEST_FUNDAMENTAL_HZ, NUM_LEVELS, TABLE_SIZE, get_wavetables
+)
+
+MAX_POLYPHONY = 64  # Upper limit on the number of voices of an OscillatorBank
+MAX_BUFFER_FRAMES = 4096  # Default for the largest block an OscillatorBank renders at once
+GLIDE_S = 0.03    # Time constant of the portamento between notes
+ATTACK_S = 0.01   # Time for a voice to ramp from silence to full amplitude
+RELEASE_S = 0.15  # Time for a voice to ramp from full amplitude to silence
+
+
+@dataclass(frozen=True)
+class VoiceParameters:
+    """Snapshot of the per-voice targets.
+
+    The control thread builds a new snapshot and swaps it in with a single assignment,
+    the audio thread reads the reference once per buffer, so a buffer never sees half an
+    update and neither side needs a lock.
+    """
+    frequencies: np.ndarray  # (voices,) Hz, 0 = release the voice
+    amplitudes: np.ndarray   # (voices,) target amplitude in [0, 1]
+
+    @classmethod
+    def create(cls, num_voices: int, frequencies: Sequence[float] = (),
+               amplitudes: Optional[Sequence[float]] = None) -> "VoiceParameters":
+        """Pad (or truncate) to num_voices; voices with a frequency default to amplitude 1."""
+        freqs = np.zeros(num_voices)
+        count = min(len(frequencies), num_voices)
+        freqs[:count] = frequencies[:count]
+        if amplitudes is None:
+            amps = (freqs > 0).astype(np.float64)
+        else:
+            amps = np.zeros(num_voices)
+            count = min(len(amplitudes), num_voices)
+            amps[:count] = amplitudes[:count]
+            amps[freqs <= 0] = 0.0
+        freqs.flags.writeable = False
+        amps.flags.writeable = False
+        return cls(freqs, amps)
+
+
+class OscillatorBank:
+    """All voices of the synth rendered in one vectorized pass per buffer.
+
+    Each voice reads its timbre's band-limited wavetable (see src/piano/wavetables.py)
+    with a phase accumulator kept in cycles. Every buffer fills a (voices, frames) phase
+    matrix, turns it into table indices, does two gathers for the linearly interpolated
+    lookup, applies the per-sample amplitude envelopes and mixes the voices down with a
+    single dot product. The mip level of every voice is picked per buffer.
+
+    Frequencies glide exponentially towards their targets sample by sample. The phase
+    is the running sum of that frequency, which has a closed form (a geometric series),
+    so the glide costs two broadcast multiply-adds instead of a cumulative sum. Voices
+    that start from silence jump straight to their pitch, released voices keep theirs.
+    Amplitudes ramp linearly with the attack and release rates.
+
+    All work buffers are allocated up front, so render() does not allocate arrays (it
+    is called from the audio callback).
+    """
+
+    def __init__(self, num_voices: int, sample_rate: int = 44100, max_frames: int = MAX_BUFFER_FRAMES,
+                 timbres: Optional[Sequence[str]] = None, glide_s: float = GLIDE_S,
+                 attack_s: float = ATTACK_S, release_s: float = RELEASE_S):
+        if not 0 < num_voices <= MAX_POLYPHONY:
+            raise ValueError(f"num_voices must be between 1 and {MAX_POLYPHONY}, got {num_voices}")
+        self.num_voices = num_voices
+        self.sample_rate = sample_rate
+        self.max_frames = max_frames
+        self.voice_gain = 1.0 / max(num_voices, 4)  # 0.25 per voice up to four voices
+        self.tables = get_wavetables(sample_rate)
+        self.parameters = VoiceParameters.create(num_voices)
+        # Targets the rendering thread itself sets in place, see update_targets
+        self._own_parameters = VoiceParameters(np.zeros(num_voices), np.zeros(num_voices))
+        self._released = np.zeros(num_voices, dtype=bool)
+        self.phase = np.zeros(num_voices)        # Cycles, in [0, 1)
+        self.frequencies = np.zeros(num_voices)  # Hz at the start of the next buffer
+        self.amplitudes = np.zeros(num_voices)   # Envelope at the start of the next buffer
+        self._timbre_offsets = np.zeros(num_voices)  # Start of each voice's level 0 table
+        self._levels = np.zeros(num_voices)
+        self._table_offsets = np.zeros(num_voices, dtype=np.int64)
+        self._mask = np.zeros(num_voices, dtype=bool)
+        self._silent = np.zeros(num_voices, dtype=bool)
+        self._targets = np.zeros(num_voices)
+        self._glide = np.zeros(num_voices)
+        self._slopes = np.zeros(num_voices)
+        self._low = np.zeros(num_voices)
+        self._high = np.zeros(num_voices)
+        self._scratch = np.zeros(num_voices)
+        self._voice_gains = np.full(num_voices, self.voice_gain)
+        self._phase_buffer = np.empty(num_voices * max_frames)
+        self._value_buffer = np.empty(num_voices * max_frames)
+        self._delta_buffer = np.empty(num_voices * max_frames)
+        self._index_buffer = np.empty(num_voices * max_frames, dtype=np.int64)
+        self._mix = np.empty(max_frames)
+        self._output = np.empty(max_frames, dtype=np.float32)
+        self.set_envelope(glide_s, attack_s, release_s)
+
+        timbres = list(timbres) if timbres is not None else []
+        for voice in range(num_voices):
+            self.set_timbre(voice, timbres[voice] if voice < len(timbres) else DEFAULT_TIMBRE)
+
+    def set_timbre(self, voice: int, timbre: str) -> None:
+        """Select one of the wavetable timbres (e.g. "sine", "organ", "piano", "choir") for a voice."""
+        self._timbre_offsets[voice] = self.tables.table_offset(timbre)
+
+    def set_envelope(self, glide_s: float, attack_s: float, release_s: float) -> None:
+        """Precompute the per-sample glide curves and envelope rates (not from the audio thread)."""
+        self.glide_s, self.attack_s, self.release_s = glide_s, attack_s, release_s
+        self._attack_step = 1.0 / max(attack_s * self.sample_rate, 1.0)
+        self._release_step = 1.0 / max(release_s * self.sample_rate, 1.0)
+        # Remaining share of the glide after n samples is ratio**n, and the first n of
+        # those sum to (1 - ratio**n) / (1 - ratio)
+        steps = np.arange(self.max_frames + 1, dtype=np.float64)
+        ratio = math.exp(-1.0 / (glide_s * self.sample_rate)) if glide_s > 0 else 0.0
+        self._glide_remaining = ratio ** steps
+        self._glide_sum = (1.0 - self._glide_remaining) / (1.0 - ratio)
+        self._sample_steps = steps
+
+    def set_targets(self, frequencies: Sequence[float], amplitudes: Optional[Sequence[float]] = None) -> None:
+        """Publish new per-voice targets, see VoiceParameters."""
+        self.parameters = VoiceParameters.create(self.num_voices, frequencies, amplitudes)
+
+    def update_targets(self, frequencies: np.ndarray, amplitudes: np.ndarray) -> None:
+        """Set new per-voice targets in place, without allocating.
+
+        Only for the thread that calls render() (e.g. the Sequencer inside the audio
+        callback), since the snapshot it writes may be the one being rendered. Both arrays
+        must have num_voices entries. Other threads use set_targets.
+        """
+        parameters = self._own_parameters
+        np.copyto(parameters.frequencies, frequencies)
+        np.copyto(parameters.amplitudes, amplitudes)
+        np.less_equal(parameters.frequencies, 0, out=self._released)
+        np.copyto(parameters.amplitudes, 0.0, where=self._released)
+        self.parameters = parameters
+
+    def _prepare_voices(self, parameters: VoiceParameters) -> None:
+        """Per-voice glide targets and envelope slopes for this buffer."""
+        mask = self._mask
+        # Voices starting from silence take their new pitch right away
+        np.greater(parameters.frequencies, 0, out=mask)
+        np.equal(self.amplitudes, 0.0, out=self._silent)
+        self._silent &= mask
+        np.copyto(self.frequencies, parameters.frequencies, where=self._silent)
+        # Released voices keep their current pitch
+        np.copyto(self._targets, self.frequencies)
+        np.copyto(self._targets, parameters.frequencies, where=mask)
+        np.subtract(self.frequencies, self._targets, out=self._glide)
+
+        # Attack or release slope, and the range the envelope is clipped to
+        np.greater(parameters.amplitudes, self.amplitudes, out=mask)
+        self._slopes.fill(-self._release_step)
+        np.copyto(self._slopes, self._attack_step, where=mask)
+        np.minimum(self.amplitudes, parameters.amplitudes, out=self._low)
+        np.maximum(self.amplitudes, parameters.amplitudes, out=self._high)
+
+    def _update_table_offsets(self) -> None:
+        """Index of the first sample of every voice's table: its timbre plus the mip level
+        whose highest fundamental is at or above the voice's highest frequency this buffer."""
+        levels = self._levels
+        np.maximum(self.frequencies, self._targets, out=levels)
+        np.maximum(levels, LOWEST_FUNDAMENTAL_HZ, out=levels)
+        np.divide(levels, LOWEST_FUNDAMENTAL_HZ, out=levels)
+        np.log2(levels, out=levels)
+        np.ceil(levels, out=levels)
+        np.minimum(levels, NUM_LEVELS - 1, out=levels)
+        levels *= TABLE_SIZE
+        levels += self._timbre_offsets
+        np.copyto(self._table_offsets, levels, casting="unsafe")
+
+    def render(self, frame_count: int) -> np.ndarray:
+        """Render the next frame_count mono samples, gliding towards the current targets.
+
+        Returns a view of an internal float32 buffer that is overwritten by the next call.
+        """
+        if frame_count > self.max_frames:
+            raise ValueError(f"frame_count {frame_count} exceeds max_frames {self.max_frames}")
+        self._prepare_voices(self.parameters)  # One snapshot for the whole buffer
+        self._update_table_offsets()
+
+        shape = (self.num_voices, frame_count)
+        size = self.num_voices * frame_count
+        phases = self._phase_buffer[:size].reshape(shape)
+        values = self._value_buffer[:size].reshape(shape)
+        deltas = self._delta_buffer[:size].reshape(shape)
+        indices = self._index_buffer[:size].reshape(shape)
+
+        # With f[n] = target + glide * ratio**n the phase in cycles is
+        # phase + (n * target + glide * sum_{k<n} ratio**k) / sample_rate
+        np.multiply(self._targets[:, None], self._sample_steps[None, :frame_count], out=phases)
+        np.multiply(self._glide[:, None], self._glide_sum[None, :frame_count], out=values)
+        phases += values
+        phases /= self.sample_rate
+        phases += self.phase[:, None]
+
+        # Continue every voice where this buffer ends
+        if frame_count > 0:
+            last = self._scratch  # Frequency of the buffer's last sample
+            np.multiply(self._glide, self._glide_remaining[frame_count - 1], out=last)
+            last += self._targets
+            last /= self.sample_rate
+            np.add(phases[:, -1], last, out=self.phase)
+            np.mod(self.phase, 1.0, out=self.phase)
+            np.multiply(self._glide, self._glide_remaining[frame_count], out=self.frequencies)
+            self.frequencies += self._targets
+
+        # Table position: integer part indexes the flat tables, fraction interpolates
+        np.floor(phases, out=values)
+        phases -= values  # Wrap to [0, 1), much cheaper than np.mod
+        phases *= TABLE_SIZE
+        np.floor(phases, out=values)
+        np.copyto(indices, values, casting="unsafe")
+        phases -= values
+        indices += self._table_offsets[:, None]
+        np.take(self.tables.values, indices, out=values)
+        np.take(self.tables.deltas, indices, out=deltas)
+        deltas *= phases
+        values += deltas
+
+        # Envelope: amplitude + slope * (n + 1), clipped between the start and the target
+        envelopes = deltas
+        np.multiply(self._slopes[:, None], self._sample_steps[None, 1:frame_count + 1], out=envelopes)
+        envelopes += self.amplitudes[:, None]
+        np.maximum(envelopes, self._low[:, None], out=envelopes)
+        np.minimum(envelopes, self._high[:, None], out=envelopes)
+        if frame_count > 0:
+            np.copyto(self.amplitudes, envelopes[:, -1])
+        values *= envelopes
+
+        mix = self._mix[:frame_count]
+        np.dot(self._voice_gains, values, out=mix)
+        output = self._output[:frame_count]
+        np.copyto(output, mix, casting="same_kind")
+        return output
@@ -1,56 +1,152 @@
 import numpy as np
-import pyaudio
 import threading
-from queue import Queue
-from typing import List
+from typing import List, Optional
 import time
 
+from src.piano.synth import ATTACK_S, GLIDE_S, MAX_BUFFER_FRAMES, MAX_POLYPHONY, RELEASE_S, OscillatorBank
+from src.piano.audio_ring import SampleRing
+from src.piano.sequencer import Sequencer
+
+SEQUENCE_LEAD_S = 0.05  # Delay between play() and the first sample of the song
+DEFAULT_BUFFER_SIZE = 4096  # Frames per callback, about 93 ms at 44.1 kHz
+LOW_LATENCY_BUFFER_SIZE = 256  # About 6 ms at 44.1 kHz
+RING_BLOCKS = 3  # Blocks rendered ahead by the producer thread in low-latency mode
+
 class ToneGenerator:
-    def __init__(self, sample_rate=44100):
+    """Polyphonic wavetable synth on a PortAudio output stream.
+
+    By default all synthesis runs inside the PortAudio callback with a large buffer.
+    With low_latency=True the stream uses a small buffer (buffer_size, default
+    LOW_LATENCY_BUFFER_SIZE) and a producer thread renders up to ring_blocks buffers
+    ahead into a lock-free SampleRing, so the callback only copies. `underruns` counts
+    callbacks the ring could not fill and `xruns` the underflows PortAudio reported.
+
+    Pitch changes glide with time constant glide_s and voices fade in and out over
+    attack_s and release_s, sample by sample (see OscillatorBank).
+
+    play() hands a compiled event array (see src/piano/sequencer.py) to a Sequencer that
+    is clocked by the samples rendered for the stream, so songs keep exact timing; the
+    sequencer owns the voices until the song ends.
+
+    PortAudio is only loaded and initialized (which enumerates every audio device) by
+    start(), so building a ToneGenerator is cheap and needs no sound card.
+    """
+    def __init__(self, sample_rate=44100, num_voices=4, timbres=None,
+                 low_latency=False, buffer_size=None, ring_blocks=RING_BLOCKS,
+                 glide_s=GLIDE_S, attack_s=ATTACK_S, release_s=RELEASE_S):
         self.sample_rate = sample_rate
-        self.buffer_size = 4096  # Increased buffer size for smoother playback
+        self.low_latency = low_latency
+        if buffer_size is None:
+            buffer_size = LOW_LATENCY_BUFFER_SIZE if low_latency else DEFAULT_BUFFER_SIZE
+        self.buffer_size = buffer_size
         self.stream = None
-        self.audio = pyaudio.PyAudio()
-        self.current_frequencies = [0.0, 0.0, 0.0, 0.0]  # Support for 4 channels
-        self.target_frequencies = [0.0, 0.0, 0.0, 0.0]
+        self.audio = None  # PyAudio instance, created by start()
+        self._pyaudio = None  # The pyaudio module, imported by start()
+        # One voice per sector, up to the polyphony limit
+        self.num_voices = min(max(num_voices, 1), MAX_POLYPHONY)
+        # Wavetable oscillators, timbres[i] (default "sine") is the timbre of voice i
+        self.bank = OscillatorBank(self.num_voices, sample_rate, max(self.buffer_size, MAX_BUFFER_FRAMES),
+                                   timbres=timbres, glide_s=glide_s, attack_s=attack_s, release_s=release_s)
         self.is_running = False
-        self.phase = [0.0, 0.0, 0.0, 0.0]  # Keep track of phase for continuity
+        self.underruns = 0
+        self.xruns = 0
+
+        # Low-latency mode: the producer thread renders into the ring, the callback copies
+        self.ring = SampleRing(ring_blocks * buffer_size) if low_latency else None
+        self._callback_buffer = np.zeros(max(buffer_size, MAX_BUFFER_FRAMES), dtype=np.float32)
+        self._producer = None
+        self._consumed = threading.Event()  # Set by the callback whenever it took samples from the ring
+
+        # Samples rendered so far, the clock of the sequencer
+        self.sample_clock = 0
+        self.sequencer: Optional[Sequencer] = None
+        self._sequence_buffer = np.zeros(max(buffer_size, MAX_BUFFER_FRAMES), dtype=np.float32)
         
-        # Frequency smoothing parameters
-        self.smoothing_factor = 0.05  # Higher = smoother but slower transitions
+    @property
+    def current_frequencies(self) -> np.ndarray:
+        return self.bank.frequencies
         
+    def render(self, frame_count: int, block_time: Optional[float] = None) -> np.ndarray:
+        """Render the next block of samples, see OscillatorBank.render.
+
+        block_time is when the block's first sample will be heard, for Sequencer.jitter.
+        """
+        sequencer = self.sequencer
+        if sequencer is None:
+            # All voices in one vectorized pass, gliding towards the latest targets
+            samples = self.bank.render(frame_count)
+        else:
+            samples = self._sequence_buffer[:frame_count]
+            sequencer.render(self.bank, self.sample_clock, samples, block_time)
+        self.sample_clock += frame_count
+        return samples
+
     def audio_callback(self, in_data, frame_count, time_info, status):
         """Generate continuous audio samples with phase continuity."""
+        if status & self._pyaudio.paOutputUnderflow:
+            self.xruns += 1
         if not self.is_running:
-            return (np.zeros(frame_count, dtype=np.float32), pyaudio.paComplete)
-        
-        # Smooth frequency transitions
-        for i in range(len(self.current_frequencies)):
-            self.current_frequencies[i] = (self.smoothing_factor * self.current_frequencies[i] + 
-                                         (1 - self.smoothing_factor) * self.target_frequencies[i])
-        
-        # Generate samples
-        t = np.arange(frame_count) / self.sample_rate
-        samples = np.zeros(frame_count, dtype=np.float32)
-        
-        for i, freq in enumerate(self.current_frequencies):
-            if freq > 0:
-                # Continue phase from previous buffer
-                phase = 2 * np.pi * freq * t + self.phase[i]
-                samples += 0.25 * np.sin(phase)  # Reduced amplitude for mixing
-                # Store ending phase for next buffer
-                self.phase[i] = phase[-1] % (2 * np.pi)
-        
-        return (samples.astype(np.float32), pyaudio.paContinue)
+            return (np.zeros(frame_count, dtype=np.float32), self._pyaudio.paComplete)
+        if self.ring is None:
+            # When the first sample reaches the speaker, on the same clock as _fill_ring
+            block_time = time.perf_counter() + self._output_delay(time_info)
+            return (self.render(frame_count, block_time), self._pyaudio.paContinue)
+
+        # Low-latency mode only copies what the producer rendered ahead
+        samples = self._callback_buffer[:frame_count]
+        copied = self.ring.read_into(samples)
+        self._consumed.set()  # Wake the producer to refill what was taken
+        if copied < frame_count:
+            samples[copied:] = 0.0
+            self.underruns += 1
+        return (samples, self._pyaudio.paContinue)
+
+    @staticmethod
+    def _output_delay(time_info) -> float:
+        """Seconds from the callback until its first sample is heard, 0 if PortAudio has no estimate.
+
+        Only the difference of PortAudio's stream clock times is used, so block times
+        stay on time.perf_counter() whatever clock the host API runs.
+        """
+        time_info = time_info or {}
+        dac_time = time_info.get("output_buffer_dac_time") or 0.0
+        current_time = time_info.get("current_time") or 0.0
+        if not dac_time or not current_time:
+            return 0.0
+        return max(dac_time - current_time, 0.0)
+
+    def _fill_ring(self) -> None:
+        """Render whole buffers into the ring until it is full."""
+        while self.ring.space() >= self.buffer_size:
+            # The block is heard once everything already in the ring has played
+            block_time = time.perf_counter() + self.ring.available() / self.sample_rate
+            self.ring.write(self.render(self.buffer_size, block_time))
+
+    def _produce(self) -> None:
+        """Producer thread of the low-latency mode: refills the ring after every callback."""
+        while self.is_running:
+            # Cleared before filling, so a callback during the fill is not missed
+            self._consumed.clear()
+            self._fill_ring()
+            self._consumed.wait()
     
     def start(self):
         """Start audio stream in separate thread."""
         if self.is_running:
             return
             
+        if self.audio is None:
+            import pyaudio  # Deferred, see the class docstring
+            self._pyaudio = pyaudio
+            self.audio = pyaudio.PyAudio()
+
         self.is_running = True
+        if self.ring is not None:
+            self._fill_ring()  # Start with a full ring so the first callbacks do not underrun
+            self._producer = threading.Thread(target=self._produce, name="tone-producer", daemon=True)
+            self._producer.start()
         self.stream = self.audio.open(
-            format=pyaudio.paFloat32,
+            format=self._pyaudio.paFloat32,
             channels=1,
             rate=self.sample_rate,
             output=True,
@@ -62,13 +158,43 @@ class ToneGenerator:
     def stop(self):
         """Stop audio stream."""
         self.is_running = False
+        if self._producer is not None:
+            self._consumed.set()  # Wake the producer so it sees is_running
+            self._producer.join()
+            self._producer = None
         if self.stream is not None:
             self.stream.stop_stream()
             self.stream.close()
-        self.audio.terminate()
+            print(f"Audio: buffer {self.buffer_size} frames, {self.underruns} underruns, {self.xruns} xruns")
+            self.stream = None
+        if self.audio is not None:
+            self.audio.terminate()
+            self.audio = None
     
-    def set_frequencies(self, frequencies: List[float]):
-        """Update target frequencies - thread safe."""
-        # Pad with zeros if needed
-        freqs = list(frequencies) + [0.0] * (4 - len(frequencies))
-        self.target_frequencies = freqs[:4]
\ No newline at end of file
+    def play(self, events: np.ndarray) -> Sequencer:
+        """Start playing a compiled event array (see compile_sequence) shortly from now."""
+        lead = int(SEQUENCE_LEAD_S * self.sample_rate)
+        sequencer = Sequencer(events, self.num_voices, start_sample=self.sample_clock + lead)
+        self.sequencer = sequencer
+        return sequencer
+
+    def wait_for_sequence(self, poll_s: float = 0.1) -> Optional[dict]:
+        """Block until the song has played out (including the releases); returns its jitter."""
+        sequencer = self.sequencer
+        if sequencer is None:
+            return None
+        # Events are applied up to a buffer ahead of playback, the clock says when the end is heard
+        end_sample = sequencer.end_sample + int(self.bank.release_s * self.sample_rate)
+        while self.is_running and self.sample_clock < end_sample + self.buffer_size:
+            time.sleep(poll_s)
+        self.sequencer = None
+        return sequencer.jitter(self.sample_rate)
+
+    @property
+    def target_frequencies(self) -> np.ndarray:
+        return self.bank.parameters.frequencies
+
+    def set_frequencies(self, frequencies: List[float], amplitudes: Optional[List[float]] = None):
+        """Update target frequencies (0 = release the voice) and optionally amplitudes - thread safe."""
+        # Padded with zeros and published as one immutable snapshot
+        self.bank.set_targets(frequencies, amplitudes)
\ No newline at end of file
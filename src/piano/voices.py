@@ -1,61 +1,11 @@
-import math
-from dataclasses import dataclass
-import yaml
-
-# Add these constants at the top with other constants
-# C major scale frequencies (C2 to C6)
-C_MAJOR_FREQUENCIES = {
-    # C2 to B2
-    'C2': 65.41,
-    'D2': 73.42,
-    'E2': 82.41,
-    'F2': 87.31,
-    'G2': 98.00,
-    'A2': 110.00,
-    'B2': 123.47,
-    
-    # C3 to B3
-    'C3': 130.81,
-    'D3': 146.83,
-    'E3': 164.81,
-    'F3': 174.61,
-    'G3': 196.00,
-    'A3': 220.00,
-    'B3': 246.94,
-    
-    # C4 to B4 (middle octave)
-    'C4': 261.63,
-    'D4': 293.66,
-    'E4': 329.63,
-    'F4': 349.23,
-    'G4': 392.00,
-    'A4': 440.00,
-    'B4': 493.88,
-    
-    # C5 to B5
-    'C5': 523.25,
-    'D5': 587.33,
-    'E5': 659.26,
-    'F5': 698.46,
-    'G5': 783.99,
-    'A5': 880.00,
-    'B5': 987.77,
-    
-    # C6
-    'C6': 1046.50,
-
-    # C7 to B7
-    'C7': 2093.00,
-    'D7': 2349.32,
-    'E7': 2637.02,
-    'F7': 2793.83,
-    'G7': 3135.96,
-    'A7': 3520.00,
-    'B7': 3951.07,
-    
-    # C8
-    'C8': 4186.01  # Highest note on a piano
-}
+from typing import List, Sequence, Tuple
+import numpy as np
+
+from src.piano.config_loader import NoteMapperConfig
+from src.piano.scales import generate_scale
+
+# C major scale frequencies (C2 to C8), equal tempered from A4 = 440 Hz
+C_MAJOR_FREQUENCIES = generate_scale("C", "major", "C2", "C8")
 
 # Middle C and one octave lower (C3 and C4)
 C3_C4_FREQUENCIES = {
@@ -69,87 +19,94 @@ C_PENTATONIC_FREQUENCIES = {
     for note in ['C3', 'D3', 'E3', 'G3', 'A3','C4']
 }
 
-@dataclass
-class RayConfig:
-    azimuth_center: float
-    azimuth_span: float
-    elevation_center: float
-    elevation_span: float
-
-@dataclass
-class NoteMapperConfig:
-    min_range: float = 0.5
-    max_range: float = 3.5
-    lowest_note: str = 'C3'
-    highest_note: str = 'C4'
-
-@dataclass
-class SectorConfig:
-    name: str
-    ray: RayConfig
-    note_mapper: NoteMapperConfig
-
 class SectorDistanceToNoteMapper:
+    """Maps a distance to a note of the configured scale.
+
+    The range is split into equal sections, the farthest section plays the lowest note.
+    `ranges` lists them as (d_min, d_max, note) from the farthest in; the compiled
+    lookup table holds the same section edges in ascending order for np.searchsorted,
+    with the note frequencies in `ranges` order.
+    """
     def __init__(self, note_mapper_config: NoteMapperConfig):
         self.min_range = note_mapper_config.min_range
         self.max_range = note_mapper_config.max_range
         self.lowest_note = note_mapper_config.lowest_note
         self.highest_note = note_mapper_config.highest_note
+        self.scale = generate_scale(note_mapper_config.key, note_mapper_config.mode,
+                                    self.lowest_note, self.highest_note, note_mapper_config.a4)
         self.ranges = []
         self._calculate_ranges()
 
     def _calculate_ranges(self):
-        # Create a list of notes from the global C_MAJOR_FREQUENCIES dictionary.
-        notes = list(C_MAJOR_FREQUENCIES.keys())
-        start_index = notes.index(self.lowest_note)
-        end_index = notes.index(self.highest_note) + 1
-        selected_notes = notes[start_index:end_index]
+        selected_notes = list(self.scale)
         
         range_size = self.max_range - self.min_range
-        section_size = range_size / len(selected_notes)
+        section_size = range_size / max(len(selected_notes), 1)
         self.ranges = [
             (self.max_range - (i + 1) * section_size, self.max_range - i * section_size, note)
             for i, note in enumerate(selected_notes)
         ]
+
+        # Compiled table: edges[j] = max_range - (n - j) * section_size is the d_min of
+        # ranges[n - 1 - j], computed exactly like the ranges above
+        count = len(selected_notes)
+        self.notes: List[str] = selected_notes
+        self.edges = self.max_range - np.arange(count, -1, -1) * section_size
+        self.frequencies = np.array([self.scale[note] for note in selected_notes], dtype=np.float64)
+
+    def get_note_index(self, distance: float) -> int:
+        """Index into `ranges` of the distance's section; the last one when out of range."""
+        count = len(self.notes)
+        section = int(np.searchsorted(self.edges, distance, side="right")) - 1
+        if 0 <= section < count:
+            return count - 1 - section
+        return count - 1
         
     def get_note_from_distance(self, distance: float) -> str:
         """Return the note corresponding to the given distance."""
-        for d_min, d_max, note in self.ranges:
-            if d_min <= distance < d_max:
-                return note
-        # Return the last note if distance is beyond calculated range.
-        return self.ranges[-1][2] if self.ranges else ""
+        # The last note if distance is beyond calculated range.
+        return self.notes[self.get_note_index(distance)] if self.notes else ""
     
     def get_frequency_from_distance(self, distance: float) -> float:
         """Return the frequency for the note corresponding to the given distance."""
-        note = self.get_note_from_distance(distance)
-        return C_MAJOR_FREQUENCIES.get(note, 0)
-        
-def load_sector_configs(config_path: str) -> dict[str, SectorConfig]:
-    with open(config_path, 'r') as file:
-        config = yaml.safe_load(file)
-    
-    sectors_list = config.get('sectors')
-    if not sectors_list:
-        raise ValueError("No sectors found in configuration.")
-
-    sector_configs = {}
-    for sec in sectors_list:
-        ray_conf = RayConfig(
-            azimuth_center=sec['angular']['azimuth_center'],  # still using 'angular' in config file
-            azimuth_span=sec['angular']['azimuth_span'],
-            elevation_center=sec['angular'].get('elevation_center', 0),
-            elevation_span=sec['angular'].get('elevation_span', 0)
-        )
-        note_mapper_conf = NoteMapperConfig(
-            min_range=sec['mapper'].get('min_range', 0.5),
-            max_range=sec['mapper'].get('max_range', 3.5),
-            lowest_note=sec['mapper'].get('lowest_note', 'C3'),
-            highest_note=sec['mapper'].get('highest_note', 'C4')
-        )
-        sector_configs[sec['name']] = SectorConfig(
-            name=sec['name'],
-            ray=ray_conf,
-            note_mapper=note_mapper_conf
-        )
-    return sector_configs
+        return float(self.frequencies[self.get_note_index(distance)]) if self.notes else 0.0
+
+
+class NoteTables:
+    """The compiled tables of several mappers, looked up for all sectors in one call.
+
+    Every sector's edges are shifted by its index times SECTOR_STRIDE_M and concatenated,
+    so a single np.searchsorted finds the section of every sector's distance.
+    """
+    SECTOR_STRIDE_M = 1000.0  # Larger than any depth a sensor reports
+
+    def __init__(self, mappers: Sequence[SectorDistanceToNoteMapper]):
+        self.num_notes = np.array([len(mapper.notes) for mapper in mappers], dtype=np.int64)
+        self.offsets = np.arange(len(mappers)) * self.SECTOR_STRIDE_M
+        self.edges = np.concatenate(
+            [mapper.edges + offset for mapper, offset in zip(mappers, self.offsets)]
+        ) if mappers else np.empty(0)
+        self.edge_starts = np.concatenate(([0], np.cumsum(self.num_notes + 1)[:-1])).astype(np.int64)
+        self.frequencies = np.concatenate([mapper.frequencies for mapper in mappers] + [np.zeros(1)])
+        self.note_starts = np.concatenate(([0], np.cumsum(self.num_notes)[:-1])).astype(np.int64)
+
+    def lookup(self, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Note index (into each mapper's ranges) and frequency for one distance per sector.
+
+        NaN distances (no detection) give note index -1 and frequency 0.
+        """
+        distances = np.asarray(distances, dtype=np.float64)
+        valid = ~np.isnan(distances) & (self.num_notes > 0)
+        sections = np.searchsorted(self.edges, distances + self.offsets, side="right") - 1 - self.edge_starts
+        in_range = (sections >= 0) & (sections < self.num_notes)
+        note_indices = np.where(valid, np.where(in_range, self.num_notes - 1 - sections, self.num_notes - 1), -1)
+        return note_indices, self.note_frequencies(note_indices)
+
+    def note_frequencies(self, note_indices: np.ndarray) -> np.ndarray:
+        """Frequency of one note index per sector, 0 where the index is -1."""
+        return np.where(note_indices >= 0, self.frequencies[self.note_starts + np.maximum(note_indices, 0)], 0.0)
+
+    def section_bounds(self, note_indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Distance range [low, high) of one note index (>= 0) per sector."""
+        edge_indices = self.edge_starts + self.num_notes - 1 - note_indices
+        return self.edges[edge_indices] - self.offsets, self.edges[edge_indices + 1] - self.offsets
@@ -0,0 +1,95 @@
+"""
+Band-limited single-cycle wavetables for the OscillatorBank.
+
+Each timbre is a recipe of harmonic amplitudes. It is rendered into one table per
+octave band ("mip level"): level k is used for fundamentals up to LOWEST_FUNDAMENTAL_HZ
+* 2**k and only keeps the harmonics that stay below Nyquist for that fundamental, so no
+voice aliases no matter how rich its timbre is.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict
+import numpy as np
+
+TABLE_SIZE = 2048  # Samples per cycle
+NUM_LEVELS = 10  # Octave bands, level 9 covers fundamentals up to about 14 kHz
+LOWEST_FUNDAMENTAL_HZ = 27.5  # A0, upper limit of level 0
+MAX_HARMONICS = 64
+CHOIR_REFERENCE_HZ = 220.0  # Fundamental the choir formants are laid out for
+DEFAULT_TIMBRE = "sine"
+
+
+def _choir_harmonics() -> np.ndarray:
+    """An "ah" vowel: harmonics weighted by two formant peaks, plus a soft 1/n body."""
+    harmonic_hz = np.arange(1, MAX_HARMONICS + 1) * CHOIR_REFERENCE_HZ
+    formants = (np.exp(-((harmonic_hz - 700.0) / 250.0) ** 2)
+                + 0.6 * np.exp(-((harmonic_hz - 1150.0) / 300.0) ** 2))
+    return formants + 0.3 / np.arange(1, MAX_HARMONICS + 1)
+
+
+def _harmonics(amplitudes: Dict[int, float]) -> np.ndarray:
+    result = np.zeros(MAX_HARMONICS)
+    for harmonic, amplitude in amplitudes.items():
+        result[harmonic - 1] = amplitude
+    return result
+
+
+_n = np.arange(1, MAX_HARMONICS + 1)
+# Harmonic amplitudes (index 0 = fundamental) of every timbre
+TIMBRE_HARMONICS: Dict[str, np.ndarray] = {
+    "sine": _harmonics({1: 1.0}),
+    # Drawbars 8', 4', 2 2/3', 2', 1 3/5' and 1'
+    "organ": _harmonics({1: 1.0, 2: 0.8, 3: 0.6, 4: 0.5, 5: 0.3, 8: 0.25}),
+    # Bright struck-string spectrum: falls off with n, the 7th harmonic is damped by the hammer position
+    "piano": np.where(_n == 7, 0.1, 1.0) / _n ** 1.5 * (_n <= 24),
+    "choir": _choir_harmonics(),
+}
+
+
+@dataclass
+class Wavetables:
+    """All timbres' mip-mapped tables, flattened for vectorized lookup.
+
+    `values` and `deltas` hold (timbre, level) tables of TABLE_SIZE samples back to back;
+    deltas[i] = values[i + 1] - values[i] (wrapping within each table), so a linearly
+    interpolated lookup is values[i] + frac * deltas[i] with a single index array.
+    """
+    sample_rate: int
+    timbres: tuple  # Timbre names in table order
+    values: np.ndarray  # (timbres * NUM_LEVELS * TABLE_SIZE,) float64
+    deltas: np.ndarray  # Same shape as values
+
+    def timbre_index(self, timbre: str) -> int:
+        try:
+            return self.timbres.index(timbre)
+        except ValueError:
+            raise ValueError(f"Unknown timbre '{timbre}', expected one of {', '.join(self.timbres)}") from None
+
+    def table_offset(self, timbre: str) -> int:
+        """Start of the timbre's level 0 table in the flat arrays."""
+        return self.timbre_index(timbre) * NUM_LEVELS * TABLE_SIZE
+
+
+def _render_table(harmonics: np.ndarray) -> np.ndarray:
+    """One cycle of the harmonic series, normalized to a peak of 1."""
+    spectrum = np.zeros(TABLE_SIZE // 2 + 1, dtype=np.complex128)
+    # Sine phase for every partial: irfft of -i/2 * N * a at bin n gives a * sin(2 pi n x)
+    spectrum[1:len(harmonics) + 1] = -0.5j * TABLE_SIZE * harmonics
+    table = np.fft.irfft(spectrum, TABLE_SIZE)
+    peak = np.abs(table).max()
+    return table / peak if peak > 0 else table
+
+
+@lru_cache(maxsize=None)
+def get_wavetables(sample_rate: int) -> Wavetables:
+    """Build (once per sample rate) the band-limited tables of every timbre."""
+    nyquist = sample_rate / 2
+    timbres = tuple(TIMBRE_HARMONICS)
+    values = np.empty((len(timbres), NUM_LEVELS, TABLE_SIZE))
+    for timbre_index, timbre in enumerate(timbres):
+        for level in range(NUM_LEVELS):
+            highest_fundamental = LOWEST_FUNDAMENTAL_HZ * 2 ** level
+            num_harmonics = max(int(nyquist // highest_fundamental), 1)
+            values[timbre_index, level] = _render_table(TIMBRE_HARMONICS[timbre][:num_harmonics])
+    deltas = np.roll(values, -1, axis=2) - values
+    return Wavetables(sample_rate, timbres, values.ravel(), deltas.ravel())
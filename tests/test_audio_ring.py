@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.piano.audio_ring import SampleRing
+
+
+def test_write_and_read_wrap_around():
+    ring = SampleRing(8)
+    out = np.zeros(8, dtype=np.float32)
+    written = 0
+    read = 0
+    # Chunk sizes that do not divide the capacity, so both indices wrap at every offset
+    for chunk in (5, 3, 7, 2, 6, 1, 8, 4):
+        samples = np.arange(written, written + chunk, dtype=np.float32)
+        assert ring.write(samples) == chunk
+        written += chunk
+        count = ring.read_into(out[:chunk])
+        assert count == chunk
+        np.testing.assert_array_equal(out[:chunk], np.arange(read, read + chunk))
+        read += chunk
+    assert ring.available() == 0 and ring.space() == 8
+
+
+def test_write_stops_when_full():
+    ring = SampleRing(4)
+    assert ring.write(np.ones(3, dtype=np.float32)) == 3
+    assert ring.write(np.arange(3, dtype=np.float32)) == 1
+    assert ring.space() == 0 and ring.available() == 4
+    out = np.zeros(6, dtype=np.float32)
+    assert ring.read_into(out) == 4
+    np.testing.assert_array_equal(out, [1, 1, 1, 0, 0, 0])
+
+
+def test_read_stops_when_empty():
+    ring = SampleRing(4)
+    ring.write(np.array([1, 2, 3], dtype=np.float32))
+    out = np.zeros(2, dtype=np.float32)
+    assert ring.read_into(out) == 2
+    assert ring.read_into(out) == 1
+    assert out[0] == 3
+    assert ring.read_into(out) == 0
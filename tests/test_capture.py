@@ -0,0 +1,72 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.io.capture import CaptureThread, FrameRing
+from src.io.frames import CameraIntrinsics, FrameData
+
+INTRINSICS = CameraIntrinsics(4, 2, 2.0, 2.0, 1.5, 0.5)
+
+
+def make_frame(index: int) -> FrameData:
+    return FrameData(depth_image=np.full((2, 4), index, dtype=np.uint16),
+                     depth_intrinsics=INTRINSICS, timestamp_ms=float(index))
+
+
+def test_full_ring_drops_the_oldest_frame():
+    ring = FrameRing(2)
+    for index in range(3):
+        ring.put(make_frame(index))
+    assert ring.captured == 3 and ring.dropped == 1
+    # Frame 0 fell out, frame 1 is discarded in favour of the newest
+    assert ring.get_latest().timestamp_ms == 2.0
+    assert ring.dropped == 2
+
+
+def test_get_latest_times_out_on_an_empty_ring():
+    ring = FrameRing(2)
+    start = time.perf_counter()
+    assert ring.get_latest(timeout=0.05) is None
+    assert time.perf_counter() - start >= 0.04
+
+
+def test_close_wakes_a_waiting_consumer():
+    ring = FrameRing(2)
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(ring.get_latest()))
+    consumer.start()
+    ring.close()
+    consumer.join(1.0)
+    assert not consumer.is_alive() and results == [None]
+
+
+def test_invalid_capacity_is_rejected():
+    with pytest.raises(ValueError):
+        FrameRing(0)
+
+
+def test_capture_thread_stops_and_closes_the_ring():
+    ring = FrameRing(2)
+    frames = iter(range(10**9))
+    capture = CaptureThread(lambda: make_frame(next(frames)), ring)
+    capture.start()
+    assert ring.get_latest(timeout=1.0) is not None
+    capture.stop()
+    assert not capture.is_alive() and capture.error is None
+    ring.get_latest(timeout=0)  # Drain whatever was captured before the stop
+    assert ring.get_latest(timeout=1.0) is None  # Closed, so no waiting
+
+
+def test_capture_thread_keeps_the_producer_error():
+    ring = FrameRing(2)
+
+    def read_frame():
+        raise RuntimeError("camera unplugged")
+
+    capture = CaptureThread(read_frame, ring)
+    capture.start()
+    capture.join(1.0)
+    assert isinstance(capture.error, RuntimeError)
+    assert ring.get_latest(timeout=1.0) is None
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.io.frame_source import FrameRecorder, RecordingFrameSource
+from src.io.frames import CameraIntrinsics, FrameData
+
+INTRINSICS = CameraIntrinsics(16, 8, 12.0, 12.0, 7.5, 3.5)
+
+
+def make_frames(count: int, with_color: bool = True):
+    rng = np.random.default_rng(0)
+    return [
+        FrameData(
+            depth_image=rng.integers(0, 2**16, (8, 16), dtype=np.uint16),
+            depth_intrinsics=INTRINSICS,
+            depth_scale=0.001,
+            timestamp_ms=1000.0 + 33.3 * index,
+            color_image=rng.integers(0, 256, (8, 16, 3), dtype=np.uint8) if with_color else None,
+        )
+        for index in range(count)
+    ]
+
+
+def record(path, frames, chunk_frames=4, close=True):
+    recorder = FrameRecorder(str(path), record_color=True, chunk_frames=chunk_frames)
+    for frame_data in frames:
+        recorder.write(frame_data)
+    if close:
+        recorder.close()
+    return recorder
+
+
+def read_all(source):
+    frames = []
+    try:
+        while True:
+            frames.append(source.read())
+    except EOFError:
+        return frames
+
+
+def assert_same_frames(replayed, frames):
+    assert len(replayed) == len(frames)
+    for replay, original in zip(replayed, frames):
+        np.testing.assert_array_equal(replay.depth_image, original.depth_image)
+        np.testing.assert_array_equal(replay.color_image, original.color_image)
+        assert replay.timestamp_ms == original.timestamp_ms
+        assert replay.depth_scale == original.depth_scale
+        assert replay.depth_intrinsics == INTRINSICS
+
+
+def test_round_trip_is_bit_exact(tmp_path):
+    frames = make_frames(10)
+    record(tmp_path, frames)
+    with RecordingFrameSource(str(tmp_path), realtime=False) as source:
+        assert len(source) == 10
+        assert_same_frames(read_all(source), frames)
+
+
+def test_read_after_the_end_raises_eof(tmp_path):
+    record(tmp_path, make_frames(3))
+    with RecordingFrameSource(str(tmp_path), realtime=False) as source:
+        read_all(source)
+        with pytest.raises(EOFError):
+            source.read()
+
+
+def test_loop_restarts_at_the_first_frame(tmp_path):
+    frames = make_frames(5)
+    record(tmp_path, frames)
+    with RecordingFrameSource(str(tmp_path), realtime=False, loop=True) as source:
+        replayed = [source.read() for _ in range(12)]
+    assert_same_frames(replayed[:5], frames)
+    assert_same_frames(replayed[5:10], frames)
+    assert replayed[10].timestamp_ms == frames[0].timestamp_ms
+
+
+def test_last_chunk_is_cut_to_its_frames(tmp_path):
+    record(tmp_path, make_frames(5), chunk_frames=300)
+    depth = np.load(os.path.join(tmp_path, "depth_00000.npy"), mmap_mode="r")
+    assert depth.shape == (5, 8, 16)
+    frame_bytes = 8 * 16 * 2
+    assert os.path.getsize(os.path.join(tmp_path, "depth_00000.npy")) < 6 * frame_bytes + 256
+
+
+def test_unclosed_recording_replays_its_complete_frames(tmp_path):
+    frames = make_frames(6)
+    recorder = record(tmp_path, frames, close=False)
+    recorder._depth_chunk.flush()
+    recorder._color_chunk.flush()
+    recorder._timestamp_chunk.flush()
+    with RecordingFrameSource(str(tmp_path), realtime=False) as source:
+        assert_same_frames(read_all(source), frames)
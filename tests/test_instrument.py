@@ -0,0 +1,18 @@
+from dataclasses import replace
+
+from src.piano.config_loader import CONFIG_PATH, load_config
+from src.piano.instrument import Instrument
+
+
+def test_unchanged_sectors_map_to_their_previous_voices():
+    configs = load_config(CONFIG_PATH)
+    names = list(configs)
+    previous = Instrument.build(configs)
+    # Reversed order, the first sector retuned and the last one removed
+    edited = {name: configs[name] for name in reversed(names[1:-1])}
+    edited[names[0]] = replace(configs[names[0]], timbre="organ")
+    instrument = Instrument.build(edited, previous=previous)
+    assert instrument.unchanged_sectors(previous) == {
+        instrument.sector_index[name]: previous.sector_index[name] for name in names[1:-1]
+    }
+    assert instrument.changed_sectors(previous) == [names[0]]
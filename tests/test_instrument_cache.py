@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.detectors import angular_detector
+from src.detectors.angular_detector import AngularBounds, Sector
+from src.detectors.sector_engine import MultiSectorDetector
+from src.io.frames import CameraIntrinsics
+from src.piano.instrument_cache import InstrumentCache, validate_instrument
+
+INTRINSICS = CameraIntrinsics(424, 240, 220.0, 220.0, 211.5, 119.5)
+DEPTH_SCALE = 0.001
+
+
+def make_detector(cache=None):
+    sectors = [
+        Sector("Left", (255, 0, 0), AngularBounds(azimuth_center=-20, azimuth_span=10)),
+        Sector("Right", (0, 0, 255), AngularBounds(azimuth_center=20, azimuth_span=10)),
+        Sector("Behind", (0, 255, 0), AngularBounds(azimuth_center=170, azimuth_span=5)),
+    ]
+    return MultiSectorDetector(sectors, cache=cache)
+
+
+@pytest.fixture
+def arrays():
+    return make_detector().compile_arrays(INTRINSICS, DEPTH_SCALE)
+
+
+def test_compiled_arrays_are_valid(arrays):
+    validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height)
+    assert arrays["roi_bounds"][2, 0] == -1  # Off-frame sector
+
+
+def test_missing_array_is_rejected(arrays):
+    del arrays["depth_limits"]
+    with pytest.raises(ValueError, match="missing depth_limits"):
+        validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height)
+
+
+def test_wrong_sector_count_is_rejected(arrays):
+    with pytest.raises(ValueError, match="4 sectors"):
+        validate_instrument(arrays, 4, INTRINSICS.width, INTRINSICS.height)
+
+
+def test_crop_outside_the_frame_is_rejected(arrays):
+    col_stop = arrays["roi_bounds"][1, 3]
+    arrays["roi_bounds"][1, 3] = INTRINSICS.width + 1
+    with pytest.raises(ValueError, match="outside the frame"):
+        validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height)
+    arrays["roi_bounds"][1, 3] = col_stop
+    arrays["roi_bounds"][0, 1] = arrays["roi_bounds"][0, 0]  # Empty row range
+    with pytest.raises(ValueError, match="outside the frame"):
+        validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height)
+
+
+def test_depth_limits_outside_the_raw_range_are_rejected(arrays):
+    arrays["depth_limits"][1, 1] = 1 << 20
+    with pytest.raises(ValueError, match="raw depth range"):
+        validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height)
+
+
+def test_cache_round_trip(tmp_path, arrays):
+    detector = make_detector(InstrumentCache(str(tmp_path)))
+    detector.compile(INTRINSICS, DEPTH_SCALE)
+    assert len(os.listdir(tmp_path)) == 1
+    cached = make_detector(InstrumentCache(str(tmp_path)))
+    loaded = cached.cache.load_or_compile(cached, INTRINSICS, DEPTH_SCALE)
+    for name, values in arrays.items():
+        np.testing.assert_array_equal(loaded[name], values)
+
+
+def test_cache_keeps_the_most_recently_used_files(tmp_path, arrays):
+    cache = InstrumentCache(str(tmp_path), max_files=2)
+    for index, key in enumerate(("a", "b", "c")):
+        cache.save(key, arrays)
+        os.utime(cache.path(key), ns=(index * 10**9, index * 10**9))
+    # Saving "c" evicted "a"; loading "b" makes it the most recent, so "d" evicts "c"
+    assert sorted(os.listdir(tmp_path)) == ["instrument_b.npz", "instrument_c.npz"]
+    assert cache.load("b") is not None
+    cache.save("d", arrays)
+    assert sorted(os.listdir(tmp_path)) == ["instrument_b.npz", "instrument_d.npz"]
+
+
+def test_stride_change_reuses_the_compiled_arrays(tmp_path):
+    cache = InstrumentCache(str(tmp_path))
+    detector = make_detector(cache)
+    detector.compile(INTRINSICS, DEPTH_SCALE)
+    (path,) = tmp_path.iterdir()
+    os.remove(path)
+    detector.stride = 2
+    detector.compile(INTRINSICS, DEPTH_SCALE)
+    assert list(tmp_path.iterdir()) == []  # Neither read nor written again
+    row_start, row_stop, _, _ = detector._arrays["roi_bounds"][0]
+    assert detector.rois[0][0] == slice(row_start, row_stop, 2)
+
+
+def test_loaded_angle_maps_are_installed(tmp_path, arrays):
+    make_detector(InstrumentCache(str(tmp_path))).compile(INTRINSICS, DEPTH_SCALE)
+    angular_detector._ANGLE_MAP_CACHE.clear()
+    make_detector(InstrumentCache(str(tmp_path))).compile(INTRINSICS, DEPTH_SCALE)
+    maps = angular_detector.get_angle_maps(INTRINSICS)
+    np.testing.assert_array_equal(maps.azimuth_cols, arrays["azimuth_cols"])
+    assert maps.azimuth_deg.shape == (INTRINSICS.height, INTRINSICS.width)
+
+
+def test_mismatched_angle_maps_are_rejected(arrays):
+    arrays["azimuth_cols"] = arrays["azimuth_cols"][::-1]
+    with pytest.raises(ValueError, match="not increasing"):
+        validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height)
+    with pytest.raises(ValueError, match="frame size"):
+        validate_instrument(arrays, 3, INTRINSICS.width, INTRINSICS.height + 1)
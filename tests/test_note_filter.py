@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.piano.config_loader import NoteMapperConfig
+from src.piano.note_filter import NoteFilter
+from src.piano.voices import NoteTables, SectorDistanceToNoteMapper
+
+# 8 notes over 0.5-3.5 m, so every section is 0.375 m deep
+TABLES = NoteTables([SectorDistanceToNoteMapper(NoteMapperConfig())] * 2)
+NAN = np.nan
+
+
+def make_filter(**kwargs):
+    return NoteFilter(TABLES, smoothing="none", hysteresis_m=0.05, on_frames=2, off_frames=3, **kwargs)
+
+
+def test_note_starts_after_on_frames():
+    note_filter = make_filter()
+    assert len(note_filter.update([1.0, NAN])) == 0
+    events = note_filter.update([1.0, NAN])
+    assert list(events["sector"]) == [0]
+    assert events["note"][0] == TABLES.lookup([1.0, NAN])[0][0]
+    assert events["frequency"][0] == note_filter.frequencies[0] > 0
+    assert note_filter.notes[1] == -1
+
+
+def test_single_detections_do_not_start_a_note():
+    note_filter = make_filter()
+    for distances in ([1.0, NAN], [NAN, NAN], [1.0, NAN], [NAN, NAN]):
+        assert len(note_filter.update(distances)) == 0
+    assert np.all(note_filter.frequencies == 0)
+
+
+def test_note_stops_after_off_frames():
+    note_filter = make_filter()
+    note_filter.update([1.0, 1.0])
+    note_filter.update([1.0, 1.0])
+    # Two dropped frames keep the note, the third releases it
+    assert len(note_filter.update([NAN, 1.0])) == 0
+    assert len(note_filter.update([NAN, 1.0])) == 0
+    events = note_filter.update([NAN, 1.0])
+    assert list(events["sector"]) == [0]
+    assert events["note"][0] == -1 and events["frequency"][0] == 0
+    assert note_filter.frequencies[1] > 0
+
+
+def test_hysteresis_holds_the_note_near_an_edge():
+    note_filter = make_filter()
+    note_filter.update([2.0, NAN])
+    note_filter.update([2.0, NAN])
+    note = note_filter.notes[0]
+    low, high = TABLES.section_bounds(note_filter.notes.clip(0))
+    # Within the hysteresis past either edge nothing changes
+    for distance in (low[0] - 0.04, high[0] + 0.04, low[0] - 0.01, 2.0):
+        assert len(note_filter.update([distance, NAN])) == 0
+        assert note_filter.notes[0] == note
+    # Clearly past the edge the note follows
+    events = note_filter.update([high[0] + 0.06, NAN])
+    assert list(events["sector"]) == [0]
+    assert events["note"][0] == TABLES.lookup([high[0] + 0.06, NAN])[0][0] != note
+
+
+def test_ema_smoothing_follows_the_distance():
+    note_filter = NoteFilter(TABLES, smoothing="ema", alpha=0.5, on_frames=1)
+    note_filter.update([1.0, NAN])
+    assert note_filter.distances[0] == pytest.approx(1.0)
+    note_filter.update([2.0, NAN])
+    assert note_filter.distances[0] == pytest.approx(1.5)
+
+
+def test_unknown_smoothing_is_rejected():
+    with pytest.raises(ValueError, match="Unknown smoothing"):
+        NoteFilter(TABLES, smoothing="kalman")
+
+
+def test_carry_over_keeps_unchanged_sectors_sounding():
+    note_filter = make_filter()
+    note_filter.update([1.0, 2.0])
+    note_filter.update([1.0, 2.0])
+    # Reloaded with the sectors swapped and only the old sector 1 unchanged
+    reloaded = make_filter()
+    reloaded.carry_over(note_filter, {0: 1})
+    assert reloaded.notes[0] == note_filter.notes[1] and reloaded.frequencies[0] == note_filter.frequencies[1]
+    assert reloaded.notes[1] == -1 and reloaded.frequencies[1] == 0
+    # No retrigger for the carried sector, the other one needs on_frames again
+    assert len(reloaded.update([2.0, 1.0])) == 0
+    assert list(reloaded.update([2.0, 1.0])["sector"]) == [1]
+    # The debounce state came along too: two dropped frames after the reload keep the note
+    assert len(reloaded.update([NAN, 1.0])) == 0
+    assert len(reloaded.update([NAN, 1.0])) == 0
+    assert list(reloaded.update([NAN, 1.0])["sector"]) == [0]
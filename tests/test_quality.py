@@ -0,0 +1,74 @@
+from src.piano.quality import QUALITY_LEVELS, AdaptiveQualityController
+
+
+def make_controller():
+    return AdaptiveQualityController(budget_ms=10.0, window=4, headroom=0.5, recover_windows=3)
+
+
+def feed_window(controller, frame_ms):
+    """Feed one full window of equal frame times and return the last update's result."""
+    results = [controller.update(frame_ms) for _ in range(controller.window)]
+    assert all(result is None for result in results[:-1])  # Only a full window can change the level
+    return results[-1]
+
+
+def test_slow_window_steps_down_right_away():
+    controller = make_controller()
+    assert feed_window(controller, 12.0) == QUALITY_LEVELS[1]
+    assert controller.index == 1
+    assert feed_window(controller, 12.0) == QUALITY_LEVELS[2]
+
+
+def test_stays_at_the_cheapest_level():
+    controller = make_controller()
+    for _ in range(len(QUALITY_LEVELS) - 1):
+        feed_window(controller, 50.0)
+    assert controller.level == QUALITY_LEVELS[-1]
+    assert feed_window(controller, 50.0) is None
+    assert controller.level == QUALITY_LEVELS[-1]
+
+
+def test_steps_up_only_after_recover_windows_fast_windows():
+    controller = make_controller()
+    feed_window(controller, 12.0)
+    assert feed_window(controller, 4.0) is None
+    assert feed_window(controller, 4.0) is None
+    assert feed_window(controller, 4.0) == QUALITY_LEVELS[0]
+    assert controller.index == 0
+
+
+def test_window_within_budget_but_above_headroom_resets_recovery():
+    controller = make_controller()
+    feed_window(controller, 12.0)
+    feed_window(controller, 4.0)
+    feed_window(controller, 4.0)
+    assert feed_window(controller, 7.0) is None  # Within budget, not fast enough to count
+    feed_window(controller, 4.0)
+    feed_window(controller, 4.0)
+    assert controller.index == 1
+    assert feed_window(controller, 4.0) == QUALITY_LEVELS[0]
+
+
+def test_slow_window_resets_recovery():
+    controller = make_controller()
+    feed_window(controller, 12.0)
+    feed_window(controller, 4.0)
+    feed_window(controller, 4.0)
+    assert feed_window(controller, 12.0) == QUALITY_LEVELS[2]
+    assert feed_window(controller, 4.0) is None
+    assert feed_window(controller, 4.0) is None
+    assert feed_window(controller, 4.0) == QUALITY_LEVELS[1]
+
+
+def test_no_step_up_from_the_best_level():
+    controller = make_controller()
+    for _ in range(5):
+        assert feed_window(controller, 1.0) is None
+    assert controller.index == 0
+
+
+def test_window_is_averaged():
+    controller = make_controller()
+    for frame_ms in (4.0, 4.0, 4.0):
+        assert controller.update(frame_ms) is None
+    assert controller.update(30.0) == QUALITY_LEVELS[1]  # Mean 10.5 ms is over budget
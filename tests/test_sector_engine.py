@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from src.detectors.angular_detector import AngularBounds, Sector
+from src.detectors.sector_engine import MultiSectorDetector
+from src.io.synthetic import SyntheticDepthScene
+
+
+def make_sectors():
+    """Four sectors across the view plus one outside the field of view."""
+    sectors = [
+        Sector(f"Sector {i}", (255, 0, 0), AngularBounds(
+            azimuth_center=center, azimuth_span=12, elevation_center=-10, elevation_span=20,
+            min_range=0.5, max_range=2.8
+        ))
+        for i, center in enumerate((-30, -10, 10, 30))
+    ]
+    sectors.append(Sector("Behind", (0, 255, 0), AngularBounds(azimuth_center=170, azimuth_span=5)))
+    return sectors
+
+
+@pytest.fixture(scope="module")
+def scene():
+    return SyntheticDepthScene(make_sectors(), width=424, height=240)
+
+
+@pytest.mark.parametrize("frame_index", [0, 7, 31, 90])
+def test_engine_matches_per_sector_detection(scene, frame_index):
+    frame_data, _ = scene.render(frame_index)
+    detector = MultiSectorDetector(scene.sectors)
+    for sector, detection in zip(scene.sectors, detector.detect(frame_data)):
+        expected = sector.detect(frame_data)
+        if expected is None:
+            assert detection is None
+            continue
+        assert detection.min_distance_m == expected.min_distance_m
+        assert detection.num_valid_points == expected.num_valid_points
+        assert detection.offset == expected.offset
+        np.testing.assert_array_equal(detection.valid_mask, expected.valid_mask)
+
+
+def test_engine_matches_ground_truth(scene):
+    frame_data, ground_truth_m = scene.render(12)
+    detections = MultiSectorDetector(scene.sectors).detect(frame_data)
+    for detection, truth in zip(detections, ground_truth_m):
+        assert (detection is None) == np.isnan(truth)
+        if detection is not None:
+            assert detection.min_distance_m == pytest.approx(truth)
+
+
+def test_off_frame_sector_is_not_detected(scene):
+    frame_data, _ = scene.render(0)
+    assert MultiSectorDetector(scene.sectors).detect(frame_data)[-1] is None
+
+
+def test_stride_samples_every_other_pixel(scene):
+    frame_data, _ = scene.render(5)
+    full = MultiSectorDetector(scene.sectors).detect(frame_data)
+    strided = MultiSectorDetector(scene.sectors, stride=2).detect(frame_data)
+    for expected, detection in zip(full, strided):
+        if detection is None:
+            continue
+        np.testing.assert_array_equal(detection.valid_mask, expected.valid_mask[::2, ::2])
+        assert detection.min_distance_m >= expected.min_distance_m
+        assert frame_data.depth_image[detection.roi].shape == detection.valid_mask.shape
+
+
+def test_detector_recompiles_for_a_new_stream(scene):
+    detector = MultiSectorDetector(scene.sectors)
+    detector.detect(scene.render(0)[0])
+    small = SyntheticDepthScene(scene.sectors, width=212, height=120)
+    frame_data, _ = small.render(3)
+    for sector, detection in zip(small.sectors, detector.detect(frame_data)):
+        expected = sector.detect(frame_data)
+        assert (detection is None) == (expected is None)
+        if detection is not None:
+            assert detection.min_distance_m == expected.min_distance_m
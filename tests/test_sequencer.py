@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from src.piano.sequencer import SequenceNote, Sequencer, TempoChange, compile_sequence
+from src.piano.synth import OscillatorBank
+
+SAMPLE_RATE = 44100
+NOTES = [
+    SequenceNote(0, 1, 0, 261.63),
+    SequenceNote(1, 1, 0, 293.66),  # Starts exactly where the previous note ends
+    SequenceNote(0.5, 2, 1, 392.0),
+    SequenceNote(2, 0.25, 1, 440.0),
+    SequenceNote(2, 1, 2, 523.25),  # Same sample as the note above, on another voice
+]
+TEMPO = [TempoChange(0, 120), TempoChange(2, 90)]
+
+
+def render(block_frames: int, timbre: str) -> np.ndarray:
+    events = compile_sequence(NOTES, TEMPO, SAMPLE_RATE)
+    bank = OscillatorBank(3, SAMPLE_RATE, timbres=[timbre] * 3)
+    sequencer = Sequencer(events, 3)
+    total = sequencer.end_sample + SAMPLE_RATE // 10
+    output = np.zeros(total, dtype=np.float32)
+    for position in range(0, total, block_frames):
+        sequencer.render(bank, position, output[position:position + block_frames])
+    assert sequencer.finished
+    return output
+
+
+@pytest.mark.parametrize("timbre", ["sine", "organ"])
+@pytest.mark.parametrize("block_frames", [17, 64, 441, 1000])
+def test_output_does_not_depend_on_block_size(block_frames, timbre):
+    reference = render(4096, timbre)
+    assert np.max(np.abs(reference)) > 0.1
+    np.testing.assert_allclose(render(block_frames, timbre), reference, atol=1e-6)
+
+
+def test_events_follow_the_tempo_map():
+    events = compile_sequence(NOTES, TEMPO, SAMPLE_RATE)
+    note_ons = events[events["frequency"] > 0]
+    # 120 bpm up to beat 2 (1 s), then 90 bpm
+    assert list(note_ons["sample"]) == [0, SAMPLE_RATE // 4, SAMPLE_RATE // 2, SAMPLE_RATE, SAMPLE_RATE]
+    end = events[(events["voice"] == 2) & (events["frequency"] == 0)]["sample"][0]
+    assert end == SAMPLE_RATE + round(SAMPLE_RATE * 60 / 90)
+
+
+def test_note_off_sorts_before_note_on_at_the_same_sample():
+    events = compile_sequence(NOTES[:2], TEMPO, SAMPLE_RATE)
+    at_boundary = events[events["sample"] == SAMPLE_RATE // 2]
+    assert list(at_boundary["frequency"]) == [0.0, 293.66]
@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+
+from src.piano.synth import OscillatorBank, VoiceParameters
+from src.piano.wavetables import (
+    LOWEST_FUNDAMENTAL_HZ, NUM_LEVELS, TABLE_SIZE, TIMBRE_HARMONICS, get_wavetables
+)
+
+SAMPLE_RATE = 48000
+
+
+def table(timbre, level):
+    tables = get_wavetables(SAMPLE_RATE)
+    start = tables.table_offset(timbre) + level * TABLE_SIZE
+    return tables.values[start:start + TABLE_SIZE]
+
+
+def test_sine_table_is_one_cycle_of_sin():
+    x = np.arange(TABLE_SIZE) / TABLE_SIZE
+    for level in range(NUM_LEVELS):
+        np.testing.assert_allclose(table("sine", level), np.sin(2 * np.pi * x), atol=1e-12)
+
+
+@pytest.mark.parametrize("timbre", sorted(TIMBRE_HARMONICS))
+def test_tables_only_hold_harmonics_below_nyquist(timbre):
+    for level in range(NUM_LEVELS):
+        spectrum = np.abs(np.fft.rfft(table(timbre, level)))
+        highest_fundamental = LOWEST_FUNDAMENTAL_HZ * 2 ** level
+        highest_harmonic = max(int(SAMPLE_RATE / 2 // highest_fundamental), 1)
+        assert spectrum[highest_harmonic + 1:].max() < 1e-9 * spectrum.max()
+        assert np.abs(table(timbre, level)).max() == pytest.approx(1.0)
+
+
+def test_unknown_timbre_is_rejected():
+    with pytest.raises(ValueError, match="Unknown timbre"):
+        OscillatorBank(1, SAMPLE_RATE, timbres=["kazoo"])
+
+
+def test_steady_sine_voice_matches_sin():
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=512, attack_s=0.0)
+    bank.set_targets([440.0])
+    output = bank.render(512)
+    # Starts at phase 0 and full amplitude, the table lookup is interpolated linearly
+    expected = bank.voice_gain * np.sin(2 * np.pi * 440.0 * np.arange(512) / SAMPLE_RATE)
+    np.testing.assert_allclose(output, expected, atol=1e-5)
+
+
+def test_render_continues_the_phase_across_buffers():
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=512, attack_s=0.0)
+    bank.set_targets([330.0])
+    output = np.concatenate([bank.render(100).copy(), bank.render(412)])  # render() reuses its buffer
+    expected = bank.voice_gain * np.sin(2 * np.pi * 330.0 * np.arange(512) / SAMPLE_RATE)
+    np.testing.assert_allclose(output, expected, atol=1e-5)
+
+
+def test_high_note_uses_a_band_limited_level():
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=4096, timbres=["piano"], attack_s=0.0)
+    bank.set_targets([4000.0])
+    spectrum = np.abs(np.fft.rfft(bank.render(4096) * np.hanning(4096)))
+    frequencies = np.fft.rfftfreq(4096, 1.0 / SAMPLE_RATE)
+    # Harmonics above Nyquist would fold back below 4 kHz
+    assert spectrum[frequencies < 3500].max() < 1e-3 * spectrum.max()
+
+
+def glide_bank(**kwargs):
+    """One sine voice already sounding 440 Hz at full amplitude."""
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=4096, **kwargs)
+    bank.set_targets([440.0])
+    bank.render(4096)
+    bank.render(4096)
+    return bank
+
+
+def test_glide_matches_the_per_sample_recurrence():
+    bank = glide_bank(glide_s=0.01)
+    phase = bank.phase[0]
+    bank.set_targets([880.0])
+    bank.render(1000)
+    # f[n] = target + (start - target) * ratio**n, the phase is its running sum
+    ratio = np.exp(-1.0 / (0.01 * SAMPLE_RATE))
+    frequencies = 880.0 + (440.0 - 880.0) * ratio ** np.arange(1001)
+    assert bank.frequencies[0] == pytest.approx(frequencies[1000])
+    expected_phase = (phase + frequencies[:1000].sum() / SAMPLE_RATE) % 1.0
+    assert bank.phase[0] == pytest.approx(expected_phase, abs=1e-9)
+
+
+def test_glide_reaches_its_target():
+    bank = glide_bank(glide_s=0.01)
+    bank.set_targets([660.0])
+    for _ in range(3):
+        bank.render(4096)  # About 25 time constants
+    assert bank.frequencies[0] == pytest.approx(660.0, abs=1e-6)
+
+
+def test_voice_from_silence_starts_at_its_pitch():
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=512, glide_s=0.05)
+    bank.set_targets([523.25])
+    bank.render(512)
+    assert bank.frequencies[0] == 523.25
+
+
+def test_released_voice_keeps_its_pitch():
+    bank = glide_bank()
+    bank.set_targets([0.0])
+    bank.render(512)
+    assert bank.frequencies[0] == pytest.approx(440.0)
+
+
+def test_attack_ramps_linearly_over_attack_s():
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=4096, attack_s=0.01)
+    ramp_frames = int(0.01 * SAMPLE_RATE)
+    bank.set_targets([440.0])
+    bank.render(ramp_frames // 2)
+    assert bank.amplitudes[0] == pytest.approx(0.5)
+    bank.render(ramp_frames // 2 - 1)
+    assert bank.amplitudes[0] < 1.0
+    bank.render(1)
+    assert bank.amplitudes[0] == pytest.approx(1.0)
+    bank.render(100)
+    assert bank.amplitudes[0] == 1.0  # Clipped at the target
+
+
+def test_release_ramps_linearly_over_release_s():
+    bank = glide_bank(release_s=0.05)
+    ramp_frames = int(0.05 * SAMPLE_RATE)
+    bank.set_targets([0.0])
+    bank.render(ramp_frames // 4)
+    assert bank.amplitudes[0] == pytest.approx(0.75)
+    bank.render(ramp_frames - ramp_frames // 4)
+    assert bank.amplitudes[0] == 0.0
+    assert np.all(bank.render(256) == 0.0)
+
+
+def test_envelope_within_a_buffer_is_linear():
+    bank = OscillatorBank(1, SAMPLE_RATE, max_frames=4096, timbres=["sine"], attack_s=0.02)
+    bank.set_targets([SAMPLE_RATE / 4])  # A quarter cycle per sample: 0, 1, 0, -1, ...
+    output = bank.render(int(0.02 * SAMPLE_RATE))
+    peaks = output[1::4] / bank.voice_gain
+    step = 1.0 / (0.02 * SAMPLE_RATE)
+    np.testing.assert_allclose(peaks, step * (np.arange(1, len(output), 4) + 1), atol=1e-6)
+
+
+def test_voice_parameters_are_padded_and_read_only():
+    parameters = VoiceParameters.create(4, [440.0, 0.0, 220.0])
+    np.testing.assert_array_equal(parameters.frequencies, [440.0, 0.0, 220.0, 0.0])
+    np.testing.assert_array_equal(parameters.amplitudes, [1.0, 0.0, 1.0, 0.0])
+    with pytest.raises(ValueError):
+        parameters.frequencies[0] = 1.0
+    truncated = VoiceParameters.create(2, [440.0, 220.0, 110.0], [0.5, 0.0, 1.0])
+    np.testing.assert_array_equal(truncated.frequencies, [440.0, 220.0])
+    np.testing.assert_array_equal(truncated.amplitudes, [0.5, 0.0])
+
+
+def test_set_targets_swaps_in_a_new_snapshot():
+    bank = OscillatorBank(2, SAMPLE_RATE, max_frames=256)
+    before = bank.parameters
+    bank.set_targets([440.0], [0.5])
+    assert bank.parameters is not before
+    np.testing.assert_array_equal(before.frequencies, [0.0, 0.0])  # A reader's snapshot never changes
+    np.testing.assert_array_equal(bank.parameters.amplitudes, [0.5, 0.0])
+
+
+def test_update_targets_writes_one_snapshot_in_place():
+    bank = OscillatorBank(3, SAMPLE_RATE, max_frames=256)
+    bank.update_targets(np.array([440.0, 0.0, 220.0]), np.array([0.5, 1.0, 1.0]))
+    parameters = bank.parameters
+    np.testing.assert_array_equal(parameters.frequencies, [440.0, 0.0, 220.0])
+    np.testing.assert_array_equal(parameters.amplitudes, [0.5, 0.0, 1.0])  # Released voices are silent
+    bank.update_targets(np.array([330.0, 0.0, 0.0]), np.array([1.0, 0.0, 0.0]))
+    assert bank.parameters is parameters
+    np.testing.assert_array_equal(parameters.frequencies, [330.0, 0.0, 0.0])
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.piano.config_loader import NoteMapperConfig
+from src.piano.voices import NoteTables, SectorDistanceToNoteMapper
+
+MAPPERS = [
+    SectorDistanceToNoteMapper(NoteMapperConfig()),
+    SectorDistanceToNoteMapper(NoteMapperConfig(min_range=0.7, max_range=2.2, lowest_note="A2",
+                                                highest_note="E4", key="A", mode="minor")),
+    SectorDistanceToNoteMapper(NoteMapperConfig(min_range=1.0, max_range=1.3, lowest_note="C4",
+                                                highest_note="C5", mode="pentatonic")),
+]
+
+
+def linear_scan(mapper: SectorDistanceToNoteMapper, distance: float) -> int:
+    """Note index as originally found by walking the ranges, the last one when out of range."""
+    for index, (d_min, d_max, _) in enumerate(mapper.ranges):
+        if d_min <= distance < d_max:
+            return index
+    return len(mapper.ranges) - 1
+
+
+def test_mapper_matches_linear_scan():
+    for mapper in MAPPERS:
+        distances = np.concatenate([np.linspace(0, 4, 2001), [edge for edge, _, _ in mapper.ranges]])
+        for distance in distances:
+            assert mapper.get_note_index(distance) == linear_scan(mapper, distance)
+
+
+def test_note_tables_match_linear_scan():
+    tables = NoteTables(MAPPERS)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        distances = rng.uniform(0, 4, len(MAPPERS))
+        note_indices, frequencies = tables.lookup(distances)
+        for mapper, distance, note_index, frequency in zip(MAPPERS, distances, note_indices, frequencies):
+            assert note_index == linear_scan(mapper, distance)
+            assert frequency == mapper.get_frequency_from_distance(distance)
+
+
+def test_note_tables_at_section_edges():
+    tables = NoteTables(MAPPERS)
+    for note in range(min(tables.num_notes)):
+        edges = [mapper.ranges[note][0] for mapper in MAPPERS]
+        note_indices, _ = tables.lookup(edges)
+        assert list(note_indices) == [linear_scan(mapper, edge) for mapper, edge in zip(MAPPERS, edges)]
+        low, high = tables.section_bounds(np.full(len(MAPPERS), note))
+        assert low == pytest.approx(edges)
+        assert high == pytest.approx([mapper.ranges[note][1] for mapper in MAPPERS])
+
+
+def test_note_tables_without_detection():
+    note_indices, frequencies = NoteTables(MAPPERS).lookup([np.nan, 1.0, np.nan])
+    assert list(note_indices[[0, 2]]) == [-1, -1]
+    assert list(frequencies[[0, 2]]) == [0.0, 0.0]
+    assert frequencies[1] == pytest.approx(MAPPERS[1].get_frequency_from_distance(1.0))